@@ -82,6 +82,7 @@ class UserProfile(models.Model):
     state = models.CharField(blank=True, max_length=20)
     country = models.CharField(blank=True, max_length=20)
     profile_picture = models.ImageField(blank=True, upload_to='images/users')
+    profile_picture_variants = models.JSONField(default=dict, blank=True, editable=False)
 
     def __str__(self):
         return self.user.first_name
@@ -1,21 +1,29 @@
 from .models import Cart, CartItem
 from .views import _cart_id
 
+# Rendered in place of the count on pages cached for every anonymous
+# visitor; store.caching swaps in each visitor's own count when serving
+CART_COUNT_MARKER = '__cart_count__'
 
-def counter(request):
+
+def count_cart_items(request):
     cart_count = 0
+    try:
+        cart = Cart.objects.filter(cart_id=_cart_id(request))
+        if request.user.is_authenticated:
+            cart_items = CartItem.objects.all().filter(user=request.user)
+        else:
+            cart_items = CartItem.objects.all().filter(cart=cart[:1])
+        for cart_item in cart_items:
+            cart_count += cart_item.quantity
+    except Cart.DoesNotExist:
+        cart_count = 0
+    return cart_count
+
+
+def counter(request):
     if 'admin' in request.path:
         return {}
-    else:
-        try:
-            cart = Cart.objects.filter(cart_id=_cart_id(request))
-            if request.user.is_authenticated:
-                cart_items = CartItem.objects.all().filter(user=request.user)
-            else:
-                cart_items = CartItem.objects.all().filter(cart=cart[:1])
-            for cart_item in cart_items:
-                cart_count += cart_item.quantity
-        except Cart.DoesNotExist:
-            cart_count = 0
-    return dict(cart_count=cart_count)
-
+    if getattr(request, 'shared_page', False):
+        return dict(cart_count=CART_COUNT_MARKER)
+    return dict(cart_count=count_cart_items(request))
@@ -0,0 +1,26 @@
+# Generated by Django 4.2 on 2026-10-18 14:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carts', '0006_alter_cart_id_alter_cartitem_id'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cart',
+            name='cart_id',
+            field=models.CharField(db_index=True, max_length=250),
+        ),
+        migrations.AddIndex(
+            model_name='cartitem',
+            index=models.Index(fields=['user', 'is_active'], name='carts_carti_user_id_94e2be_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cartitem',
+            index=models.Index(fields=['cart', 'product'], name='carts_carti_cart_id_8f3e40_idx'),
+        ),
+    ]
@@ -6,7 +6,7 @@ from accounts.models import Account
 
 
 class Cart(models.Model):
-    cart_id = models.CharField(max_length=250)
+    cart_id = models.CharField(max_length=250, db_index=True)
     date_added = models.DateField(auto_now_add=True)
 
     def __str__(self):
@@ -22,6 +22,12 @@ class CartItem(models.Model):
     quantity = models.IntegerField()
     is_active = models.BooleanField(default=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'is_active']),
+            models.Index(fields=['cart', 'product']),
+        ]
+
     def sub_total(self):
         return self.product.price * self.quantity
 
@@ -3,6 +3,7 @@ from . import views
 
 urlpatterns = [
     path('', views.cart, name='cart'),
+    path('recommendations/', views.cart_recommendations, name='cart_recommendations'),
     path('add_cart/<int:product_id>/', views.add_cart, name='add_cart'),
     path('remove_cart/<int:product_id>/<int:cart_item_id>/', views.remove_cart, name='remove_cart'),
     path('remove_cart_item/<int:product_id>/<int:cart_item_id>/', views.remove_cart_item, name='remove_cart_item'),
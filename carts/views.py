@@ -4,7 +4,8 @@ from django.contrib.auth.decorators import login_required
 from .models import Cart, CartItem
 from store.models import Product, Variation
 from django.http import HttpResponse
-from store.recommendations import get_apriori_recommendations
+from django.template.loader import render_to_string
+from store.recommendations import get_recommendations_within_budget
 
 # Create your views here.
 
@@ -12,7 +13,8 @@ from store.recommendations import get_apriori_recommendations
 def _cart_id(request):
     cart = request.session.session_key
     if not cart:
-        cart = request.session.create()
+        request.session.create()  # returns None; the new key is on the session
+        cart = request.session.session_key
     return cart
 
 
@@ -182,7 +184,6 @@ def remove_cart_item(request, product_id, cart_item_id):
     cart_item.delete()
     return redirect('cart')
 
-# Apriori Algorithm
 def cart(request, total=0, quantity=0, cart_items=None):
     try:
         tax = 0
@@ -192,6 +193,7 @@ def cart(request, total=0, quantity=0, cart_items=None):
         else:
             cart = Cart.objects.get(cart_id=_cart_id(request))
             cart_items = CartItem.objects.filter(cart=cart, is_active=True)
+        cart_items = cart_items.select_related('product').prefetch_related('variations')
         for cart_item in cart_items:
             total += cart_item.product.price * cart_item.quantity
             quantity += cart_item.quantity
@@ -200,20 +202,35 @@ def cart(request, total=0, quantity=0, cart_items=None):
     except ObjectDoesNotExist:
         pass  # just ignore
 
-    cart_product_ids = cart_items.values_list('product_id', flat=True)
-    recommended_products = get_apriori_recommendations(cart_product_ids)
-
     context = {
         "total": total,
         "quantity": quantity,
         "cart_items": cart_items,
         "tax": tax,
         "grand_total": grand_total,
-        "recommended_products": recommended_products,  # Apriory Algorithm
     }
     return render(request, "store/cart.html", context)
 
 
+# Apriori Algorithm, loaded by the cart page after it is displayed
+def cart_recommendations(request):
+    try:
+        if request.user.is_authenticated:
+            cart_items = CartItem.objects.filter(user=request.user, is_active=True)
+        else:
+            cart = Cart.objects.get(cart_id=_cart_id(request))
+            cart_items = CartItem.objects.filter(cart=cart, is_active=True)
+        cart_product_ids = list(cart_items.values_list('product_id', flat=True))
+    except ObjectDoesNotExist:
+        cart_product_ids = []
+
+    context = {
+        "recommended_products": get_recommendations_within_budget(cart_product_ids),
+    }
+    # Rendered without the request so the site-wide context processors don't run
+    return HttpResponse(render_to_string("includes/recommendations.html", context))
+
+
 @login_required(login_url='login')
 def checkout(request, total=0, quantity=0, cart_items=None):
     try:
@@ -224,6 +241,7 @@ def checkout(request, total=0, quantity=0, cart_items=None):
         else:
             cart = Cart.objects.get(cart_id=_cart_id(request))
             cart_items = CartItem.objects.filter(cart=cart, is_active=True)
+        cart_items = cart_items.select_related('product').prefetch_related('variations')
         for cart_item in cart_items:
             total += (cart_item.product.price * cart_item.quantity)
             quantity += cart_item.quantity
@@ -1,5 +1,5 @@
-from .models import Category
+from .menu import menu_categories
 
 def menu_links(request):
-    links = Category.objects.all()
-    return dict(links=links)
\ No newline at end of file
+    links = menu_categories()
+    return dict(links=links)
@@ -0,0 +1,46 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .models import Category
+
+VERSION_KEY = 'category_menu:version'
+
+# (version, loaded at, categories) as last loaded by this process
+_menu = (None, float('-inf'), [])
+
+
+def menu_version():
+    """
+    Version of the menu in the shared cache. It is a timestamp, so when
+    the key is evicted the next one still differs from every earlier one.
+    """
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = time.time_ns()
+        cache.set(VERSION_KEY, version, None)
+    return version
+
+
+def invalidate_menu():
+    cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def menu_categories():
+    """
+    Every category with product_count, its number of available products.
+    Loaded once per process and again after invalidate_menu() or once the
+    copy is CATEGORY_MENU_MAX_AGE seconds old, so the steady state costs a
+    cache lookup and no queries. The version only reaches other processes
+    through a shared cache; the max age bounds how stale they get without one.
+    """
+    global _menu
+    version = menu_version()
+    if _menu[0] != version or time.monotonic() - _menu[1] >= settings.CATEGORY_MENU_MAX_AGE:
+        categories = list(Category.objects
+                          .annotate(product_count=Count('product', filter=Q(product__is_available=True)))
+                          .order_by('id'))
+        _menu = (version, time.monotonic(), categories)
+    return _menu[2]
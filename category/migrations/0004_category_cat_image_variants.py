@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 14:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('category', '0003_alter_category_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='cat_image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
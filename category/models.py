@@ -7,6 +7,7 @@ class Category(models.Model):
     slug = models.SlugField(max_length=100, unique=True)
     description = models.TextField(max_length=255, blank=True)
     cat_image = models.ImageField(upload_to='photos/categories', blank=True)
+    cat_image_variants = models.JSONField(default=dict, blank=True, editable=False)
 
     class Meta:
         verbose_name = 'category'
@@ -0,0 +1,33 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from store.models import Product, is_stock_update
+
+from .menu import invalidate_menu
+from .models import Category
+
+
+# Reload the category menu, and its product counts, everywhere
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_category_menu(sender, **kwargs):
+    if sender is Product and is_stock_update(kwargs.get('update_fields')):
+        return  # product counts only cover availability
+    invalidate_menu()
+
+
+# Products store their URL, which includes the category slug
+@receiver(post_save, sender=Category)
+def update_product_urls(sender, instance, created, **kwargs):
+    if created:
+        return
+    stale = list(Product.objects
+                 .filter(category=instance)
+                 .exclude(url_path__startswith=instance.get_url())
+                 .only('id', 'slug', 'category_id'))
+    for product in stale:
+        product.category = instance
+        product.url_path = product.build_url_path()
+    Product.objects.bulk_update(stale, ['url_path'], batch_size=1000)
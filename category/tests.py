@@ -1,3 +1,39 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
-# Create your tests here.
+from store.models import Product
+
+from .menu import invalidate_menu, menu_categories
+from .models import Category
+
+
+@override_settings(CATEGORY_MENU_MAX_AGE=300)
+class MenuTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(category_name='Shirts', slug='shirts')
+
+    def setUp(self):
+        invalidate_menu()
+
+    def add_product(self, name):
+        return Product.objects.create(product_name=name, slug=name.lower(), price=100,
+                                      images='photoes/products/Blue-Shirt.jpg', stock=5, category=self.category)
+
+    def test_invalidation_is_picked_up(self):
+        self.assertEqual([c.product_count for c in menu_categories()], [0])
+        with self.assertNumQueries(0):
+            menu_categories()
+
+        self.add_product('Shirt')  # the Product signal invalidates the menu
+        self.assertEqual([c.product_count for c in menu_categories()], [1])
+        Category.objects.create(category_name='Jeans', slug='jeans')
+        self.assertEqual([c.slug for c in menu_categories()], ['shirts', 'jeans'])
+
+    def test_copy_expires_without_invalidation(self):
+        menu_categories()
+        # as if another process changed the catalog and bumped a version this one cannot see
+        Category.objects.filter(pk=self.category.pk).update(category_name='Tops')
+        self.assertEqual(menu_categories()[0].category_name, 'Shirts')
+        with self.settings(CATEGORY_MENU_MAX_AGE=0):
+            self.assertEqual(menu_categories()[0].category_name, 'Tops')
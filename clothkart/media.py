@@ -0,0 +1,123 @@
+import mimetypes
+import os
+import posixpath
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+from .storage import is_hashed
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+CHUNK_SIZE = 64 * 1024
+
+# Content-hashed names never change content
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+
+def parse_range(header, size):
+    """
+    The (first, last) byte of a single "bytes=first-last" Range header,
+    or None when there is none, it is malformed or it asks for several
+    ranges: the whole file is sent then. Raises ValueError for a range
+    that starts past the end.
+    """
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        # "bytes=-500": the last 500 bytes
+        if int(last) == 0:
+            raise ValueError('empty suffix range')
+        return max(size - int(last), 0), size - 1
+    first = int(first)
+    if last and int(last) < first:
+        return None
+    if first >= size:
+        raise ValueError('range starts past the end')
+    return first, min(int(last), size - 1) if last else size - 1
+
+
+def read_range(path, first, last):
+    with open(path, 'rb') as f:
+        f.seek(first)
+        remaining = last - first + 1
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Serve an upload under MEDIA_ROOT. Answers If-None-Match and
+    If-Modified-Since with 304 and a single byte range with 206. With
+    MEDIA_SENDFILE set, only the headers come from here and the front
+    proxy sends the file itself.
+    """
+    path = posixpath.normpath(path).lstrip('/')
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        status = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404('No such file')
+    if not stat.S_ISREG(status.st_mode):
+        raise Http404('No such file')
+
+    etag = f'"{status.st_mtime_ns:x}-{status.st_size:x}"'
+    last_modified = int(status.st_mtime)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+    if response is None:
+        content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+        if settings.MEDIA_SENDFILE == 'x-accel-redirect':
+            response = HttpResponse(content_type=content_type)
+            response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + quote(path)
+        elif settings.MEDIA_SENDFILE == 'x-sendfile':
+            response = HttpResponse(content_type=content_type)
+            response['X-Sendfile'] = full_path
+        else:
+            response = file_response(request, full_path, status.st_size, content_type, etag, last_modified)
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    if is_hashed(path):
+        patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=settings.MEDIA_MAX_AGE)
+    return response
+
+
+def file_response(request, full_path, size, content_type, etag, last_modified):
+    if_range = request.headers.get('If-Range')
+    if if_range and if_range not in (etag, http_date(last_modified)):
+        byte_range = None  # the client's partial copy is stale: send it all
+    else:
+        try:
+            byte_range = parse_range(request.headers.get('Range', ''), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if byte_range is None:
+        response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+    else:
+        first, last = byte_range
+        response = StreamingHttpResponse(read_range(full_path, first, last), status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {first}-{last}/{size}'
+        response['Content-Length'] = last - first + 1
+    response['Accept-Ranges'] = 'bytes'
+    return response
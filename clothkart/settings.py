@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.1/ref/settings/
 """
 
+import sys
 from pathlib import Path
 from decouple import config
 
@@ -54,6 +55,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -152,10 +154,109 @@ STATICFILES_DIRS = [
     "clothkart/static",
 ]
 
+# Uploads are stored under content-hashed names. Outside DEBUG,
+# collectstatic writes content-hashed copies of every file plus .gz (and
+# .br, with Brotli installed) versions; WhiteNoise serves the hashed names
+# with a far-future immutable Cache-Control. The test runner never runs
+# collectstatic, so it keeps the plain names whatever DEBUG says.
+TESTING = sys.argv[1:2] == ['test']
+STORAGES = {
+    "default": {
+        "BACKEND": "clothkart.storage.HashedMediaStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage" if DEBUG or TESTING
+        else "clothkart.storage.HashedStaticFilesStorage",
+    },
+}
+
+# Unhashed static files (the manifest misses, e.g. anything linked without
+# {% static %}) are cached for this many seconds
+WHITENOISE_MAX_AGE = config('WHITENOISE_MAX_AGE', default=0 if DEBUG else 3600, cast=int)
+
 # Media Files configurations
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Media is served by clothkart.media.serve_media: '' streams files from
+# Django, 'x-sendfile' (Apache, lighttpd) or 'x-accel-redirect' (nginx)
+# lets the front proxy send them
+MEDIA_SENDFILE = config('MEDIA_SENDFILE', default='')
+# nginx internal location whose alias is MEDIA_ROOT, for x-accel-redirect
+MEDIA_ACCEL_PREFIX = config('MEDIA_ACCEL_PREFIX', default='/protected-media/')
+# Cache lifetime (seconds) of media without a content hash in its name
+MEDIA_MAX_AGE = config('MEDIA_MAX_AGE', default=3600, cast=int)
+
+# Thumbnail widths (px) made for every uploaded image, as WebP and JPEG
+IMAGE_VARIANT_WIDTHS = (160, 320, 640)
+
+
+# Store listing: pages past this one are fetched with keyset cursors instead of OFFSET
+STORE_PAGE_NUMBER_LIMIT = config('STORE_PAGE_NUMBER_LIMIT', default=5, cast=int)
+
+# Product search: dotted path to a store.search.SearchBackend subclass;
+# empty picks the backend for the database (FTS5 on SQLite, GIN on Postgres)
+STORE_SEARCH_BACKEND = config('STORE_SEARCH_BACKEND', default='')
+
+# Search autocomplete: how often (seconds) each process checks whether its
+# in-memory prefix index is stale
+STORE_AUTOCOMPLETE_CHECK_SECONDS = config('STORE_AUTOCOMPLETE_CHECK_SECONDS', default=30, cast=int)
+
+# Cache
+# LocMemCache evicts least recently used entries once MAX_ENTRIES is reached.
+# Use a shared backend (Redis/Memcached) to share entries between workers.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "recommendations": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "recommendations",
+        "TIMEOUT": config('RECOMMENDATION_CACHE_TIMEOUT', default=600, cast=int),
+        "OPTIONS": {"MAX_ENTRIES": 5000},
+    },
+    "pages": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "pages",
+        "OPTIONS": {"MAX_ENTRIES": 1000},
+    },
+}
+
+# Whole store and product pages cached for anonymous visitors, in seconds;
+# 0 turns it off. With a per-process cache like LocMem, a change made in
+# one process reaches the others' cached pages only when they expire.
+STORE_PAGE_CACHE_TIMEOUT = config('STORE_PAGE_CACHE_TIMEOUT', default=0, cast=int)
+
+# Category menu: each process keeps its copy at most this many seconds.
+# invalidate_menu() reaches every process at once only with a shared
+# cache; with LocMem the other processes catch up when their copy expires.
+CATEGORY_MENU_MAX_AGE = config('CATEGORY_MENU_MAX_AGE', default=300, cast=int)
+
+# Home page: products per section, and how long (seconds) the section id
+# lists are kept before they are recomputed; rebuild_home_feed refreshes them
+HOME_FEED_SIZE = config('HOME_FEED_SIZE', default=8, cast=int)
+HOME_FEED_TIMEOUT = config('HOME_FEED_TIMEOUT', default=900, cast=int)
+
+# Recommendations
+# Frequent itemset algorithm used when mining order baskets: 'apriori' (sparse) or
+# 'fpgrowth' (densifies the basket, so only for small histories)
+RECOMMENDATION_MINING_ALGORITHM = config('RECOMMENDATION_MINING_ALGORITHM', default='apriori')
+# Processes counting itemsets in parallel during a rebuild (apriori only)
+RECOMMENDATION_MINING_WORKERS = config('RECOMMENDATION_MINING_WORKERS', default=1, cast=int)
+# Engine answering the cart page: 'rules' (mined association rules), 'cooccurrence'
+# (published item-to-item model) or 'counters' (live co-occurrence counts, no mining)
+RECOMMENDATION_ENGINE = config('RECOMMENDATION_ENGINE', default='rules')
+# Number of products the item-to-item engine returns
+RECOMMENDATION_COUNT = config('RECOMMENDATION_COUNT', default=6, cast=int)
+# Longest the cart's recommendation panel waits before serving popular products
+RECOMMENDATION_TIME_BUDGET_MS = config('RECOMMENDATION_TIME_BUDGET_MS', default=200, cast=int)
+# Where published item-to-item models live; workers memory-map the live version
+RECOMMENDATION_MODEL_DIR = config('RECOMMENDATION_MODEL_DIR', default=str(BASE_DIR / 'var' / 'recommendations'))
+# Only mine orders from the last N days (0 = whole history)
+RECOMMENDATION_WINDOW_DAYS = config('RECOMMENDATION_WINDOW_DAYS', default=0, cast=int)
+# Halve the weight of co-occurrences every N days (0 = no decay); needs a window
+RECOMMENDATION_HALF_LIFE_DAYS = config('RECOMMENDATION_HALF_LIFE_DAYS', default=0, cast=float)
+
 
 from django.contrib.messages import constants as messages
 
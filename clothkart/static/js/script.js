@@ -46,6 +46,46 @@ $(document).ready(function () {
     // check if element exists
     $('[data-toggle="tooltip"]').tooltip();
   } // end if
+
+  //////////////////////// Search suggestions
+  var $search = $("input[data-autocomplete-url]");
+  var $suggestions = $(".search-suggestions");
+  var suggestTimer = null;
+  var suggestRequest = null;
+
+  $search.on("input", function () {
+    var url = $(this).data("autocomplete-url");
+    var q = $.trim($(this).val());
+    clearTimeout(suggestTimer);
+    if (!q) {
+      $suggestions.removeClass("show").empty();
+      return;
+    }
+    // wait for a pause in typing, and drop answers to older keystrokes
+    suggestTimer = setTimeout(function () {
+      if (suggestRequest) {
+        suggestRequest.abort();
+      }
+      suggestRequest = $.getJSON(url, { q: q }, function (data) {
+        $suggestions.empty();
+        $.each(data.results, function (i, item) {
+          $("<a class='dropdown-item'></a>")
+            .attr("href", item.url)
+            .text(item.label)
+            .append(item.type === "category" ? " <small class='text-muted'>in categories</small>" : "")
+            .appendTo($suggestions);
+        });
+        $suggestions.toggleClass("show", data.results.length > 0);
+      });
+    }, 150);
+  });
+
+  $search.on("blur", function () {
+    // let a click on a suggestion land first
+    setTimeout(function () {
+      $suggestions.removeClass("show");
+    }, 200);
+  });
 });
 // jquery end
 
@@ -17,7 +17,7 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from . import views
-from django.conf.urls.static import static
+from .media import serve_media
 from django.conf import settings
 
 urlpatterns = [
@@ -29,4 +29,7 @@ urlpatterns = [
 
     # ORDERS
     path('orders/', include('orders.urls')),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+
+    # MEDIA
+    path(settings.MEDIA_URL.lstrip('/') + '<path:path>', serve_media, name='media'),
+]
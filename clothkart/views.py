@@ -1,12 +1,12 @@
 from django.shortcuts import render
-from store.models import Product
+from store.feed import home_feed
 
 # Create your views here.
 
 def home(request):
-    products = Product.objects.all().filter(is_available=True)
+    sections = home_feed()
 
     context = {
-        'products': products,
+        'sections': sections,
     }
-    return render(request, 'home.html', context)
\ No newline at end of file
+    return render(request, 'home.html', context)
@@ -3,7 +3,7 @@ from django.http import JsonResponse, HttpResponse
 from carts.models import CartItem
 from .forms import OrderForm
 from .models import Order, Payment, OrderProduct
-from store.models import Product
+from store.recommendations import record_order_cooccurrence
 from django.core.mail import EmailMessage
 from django.template.loader import render_to_string
 import datetime
@@ -64,7 +64,7 @@ def payments(request):
 # =========================
 def place_order(request, total=0, quantity=0):
     current_user = request.user
-    cart_items = CartItem.objects.filter(user=current_user)
+    cart_items = CartItem.objects.filter(user=current_user).select_related('product').prefetch_related('variations')
 
     if cart_items.count() == 0:
         return redirect('store')
@@ -159,7 +159,7 @@ def order_complete(request):
     order.save()
 
     # Move cart items to OrderProduct
-    cart_items = CartItem.objects.filter(user=order.user)
+    cart_items = CartItem.objects.filter(user=order.user).select_related('product__category')
 
     for item in cart_items:
         order_product = OrderProduct.objects.create(
@@ -175,7 +175,10 @@ def order_complete(request):
 
         # Reduce stock
         item.product.stock -= item.quantity
-        item.product.save()
+        item.product.save(update_fields=['stock'])
+
+    # Keep the recommendation co-occurrence counters fresh
+    record_order_cooccurrence([item.product_id for item in cart_items])
 
     cart_items.delete()
 
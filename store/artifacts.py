@@ -0,0 +1,89 @@
+"""
+Versioned on-disk recommendation models.
+
+    RECOMMENDATION_MODEL_DIR/
+        CURRENT                       name of the live version
+        20261018T140312123456-3f2a/   one directory per published version
+        days/                         per-day counts kept by windowed builds
+
+Publishing writes a new version directory and then swaps CURRENT with
+os.replace, so readers see either the old or the new model, never a
+half-written one. Every worker memory-maps the live version read-only.
+"""
+import os
+import shutil
+import uuid
+
+from django.conf import settings
+from django.utils import timezone
+
+from store.cooccurrence import CooccurrenceRecommender
+
+CURRENT = 'CURRENT'
+
+# (CURRENT mtime, version, model) for the model mapped by this process
+_loaded = (None, None, None)
+
+
+def _model_dir():
+    return str(settings.RECOMMENDATION_MODEL_DIR)
+
+
+def daily_counts_dir():
+    return os.path.join(_model_dir(), 'days')
+
+
+def publish_model(recommender, keep=3):
+    """Save the recommender as a new version, make it live and prune old versions."""
+    root = _model_dir()
+    os.makedirs(root, exist_ok=True)
+
+    version = f"{timezone.now():%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:4]}"
+    staging = os.path.join(root, f'.{version}')
+    os.makedirs(staging)
+    recommender.save(staging)
+    os.rename(staging, os.path.join(root, version))
+
+    pointer = os.path.join(root, f'.{CURRENT}-{version}')
+    with open(pointer, 'w') as f:
+        f.write(version)
+    os.replace(pointer, os.path.join(root, CURRENT))
+
+    # Workers still mapping a pruned version keep their open files until they reload
+    versions = sorted(name for name in os.listdir(root) if name[:1].isdigit())
+    for name in versions[:-keep]:
+        if name == version:
+            continue
+        shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+    return version
+
+
+def current_version():
+    """Name of the live version, or None when nothing has been published."""
+    try:
+        with open(os.path.join(_model_dir(), CURRENT)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def load_current_model():
+    """
+    Return the live model, memory-mapping it on first use and again
+    whenever a new version is published. Costs one stat() per call once
+    the model is mapped; returns None when no model has been published.
+    """
+    global _loaded
+    try:
+        mtime = os.stat(os.path.join(_model_dir(), CURRENT)).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    if mtime != _loaded[0]:
+        version = current_version()
+        if version != _loaded[1]:
+            _loaded = (mtime, version, CooccurrenceRecommender.load(os.path.join(_model_dir(), version)))
+        else:
+            _loaded = (mtime, version, _loaded[2])
+    return _loaded[2]
@@ -0,0 +1,122 @@
+import hashlib
+import heapq
+import re
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db.models import Count, Max, Sum
+
+from category.models import Category
+
+from .models import Product, ProductOrderCount
+
+WORD_RE = re.compile(r'[^\W_]+')
+
+# Prefix answers kept per index; the index is small, so is the memo
+MEMO_SIZE = 10000
+
+
+def normalize(text):
+    return ' '.join(WORD_RE.findall(text.lower()))
+
+
+class PrefixIndex:
+    """
+    Product and category names in one sorted array of keys. Each name is
+    stored once per word it contains, from that word to the end, so "sh"
+    and "blue sh" both find "Blue Shirt". A prefix maps to a contiguous
+    run of keys, found with two bisects.
+    """
+
+    def __init__(self, entries):
+        # entries: (popularity, label, url, kind)
+        self.entries = sorted(entries, key=lambda entry: (-entry[0], entry[1]))
+        keys = []
+        for position, (_, label, _, _) in enumerate(self.entries):
+            words = normalize(label).split()
+            keys.extend((' '.join(words[start:]), position) for start in range(len(words)))
+        keys.sort()
+        self.keys = [key for key, _ in keys]
+        self.positions = [position for _, position in keys]
+        self.memo = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def suggest(self, prefix, limit=8):
+        """Top `limit` entries, most popular first, whose name has a word starting with prefix."""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        positions = self.memo.get((prefix, limit))
+        if positions is None:
+            low = bisect_left(self.keys, prefix)
+            high = bisect_left(self.keys, prefix + '\uffff', low)
+            # Entries are sorted by popularity, so the smallest positions win
+            positions = heapq.nsmallest(limit, set(self.positions[low:high]))
+            if len(self.memo) >= MEMO_SIZE:
+                self.memo.clear()
+            self.memo[prefix, limit] = positions
+        return [self.entries[position] for position in positions]
+
+
+def build_index():
+    counts = dict(ProductOrderCount.objects.values_list('product_id', 'count'))
+    entries = []
+    category_popularity = {}
+    for product in Product.objects.filter(is_available=True).select_related('category'):
+        popularity = counts.get(product.id, 0)
+        category_popularity[product.category_id] = category_popularity.get(product.category_id, 0) + popularity
+        entries.append((popularity, product.product_name, product.get_url(), 'product'))
+    for category in Category.objects.all():
+        entries.append((category_popularity.get(category.id, 0), category.category_name, category.get_url(), 'category'))
+    return PrefixIndex(entries)
+
+
+def catalog_fingerprint():
+    """Changes whenever a product, a category name or an order count does."""
+    products = Product.objects.aggregate(count=Count('id'), modified=Max('modified_date'))
+    orders = ProductOrderCount.objects.aggregate(total=Sum('count'))
+    categories = Category.objects.order_by('id').values_list('id', 'category_name', 'slug')
+    digest = hashlib.md5(repr(list(categories)).encode()).hexdigest()
+    return (products['count'], products['modified'], orders['total'], digest)
+
+
+_index = None
+_fingerprint = None
+_checked_at = float('-inf')
+_lock = threading.Lock()
+
+
+def get_index():
+    """
+    The process's prefix index, built on first use. At most every
+    STORE_AUTOCOMPLETE_CHECK_SECONDS a cheap fingerprint query decides
+    whether the catalog changed and the index must be rebuilt.
+    """
+    global _index, _fingerprint, _checked_at
+    if _index is not None and time.monotonic() - _checked_at < settings.STORE_AUTOCOMPLETE_CHECK_SECONDS:
+        return _index
+    with _lock:
+        if _index is None or time.monotonic() - _checked_at >= settings.STORE_AUTOCOMPLETE_CHECK_SECONDS:
+            fingerprint = catalog_fingerprint()
+            if _index is None or fingerprint != _fingerprint:
+                _index = build_index()
+                _fingerprint = fingerprint
+            _checked_at = time.monotonic()
+    return _index
+
+
+def invalidate():
+    """Force the next lookup in this process to check the catalog."""
+    global _checked_at
+    _checked_at = float('-inf')
+
+
+def suggest(prefix, limit=8):
+    return [
+        {'label': label, 'url': url, 'type': kind}
+        for _, label, url, kind in get_index().suggest(prefix, limit)
+    ]
@@ -0,0 +1,90 @@
+import hashlib
+import re
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils import timezone
+
+from carts.context_processors import CART_COUNT_MARKER, count_cart_items
+
+from .models import Product
+
+CSRF_MARKER = '__csrf_token__'
+CSRF_INPUT_RE = re.compile(r'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+
+
+def page_cache():
+    return caches['pages']
+
+
+def page_version():
+    """
+    Version every cached page key includes. It is a timestamp, so when
+    the key is evicted the next one still differs from every earlier one.
+    """
+    version = page_cache().get('version')
+    if version is None:
+        version = time.time_ns()
+        page_cache().set('version', version, None)
+    return version
+
+
+def bump_page_version():
+    """Retire every cached page."""
+    page_cache().set('version', time.time_ns(), None)
+
+
+def touch_product(product_id):
+    """
+    Move the product's modified_date on, retiring its cached fragments
+    (keyed on it) and every cached page.
+    """
+    Product.objects.filter(pk=product_id).update(modified_date=timezone.now())
+    bump_page_version()
+
+
+def _shareable(request):
+    return (settings.STORE_PAGE_CACHE_TIMEOUT
+            and request.method in ('GET', 'HEAD')
+            and not request.user.is_authenticated
+            and 'messages' not in request.COOKIES)
+
+
+def _personalize(content, request):
+    content = content.replace(CSRF_MARKER, get_token(request))
+    return content.replace(CART_COUNT_MARKER, str(count_cart_items(request)))
+
+
+def cache_anonymous_page(view):
+    """
+    Serve the view's page to anonymous visitors from the 'pages' cache
+    for STORE_PAGE_CACHE_TIMEOUT seconds (0 turns it off). The page is
+    stored with markers in place of the CSRF token and the cart count,
+    and each visitor's own are put back when it is served.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not _shareable(request):
+            return view(request, *args, **kwargs)
+
+        path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+        key = f'page:{page_version()}:{path}'
+        content = page_cache().get(key)
+        if content is None:
+            request.shared_page = True
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200 or response.streaming:
+                return response
+            content = CSRF_INPUT_RE.sub(rf'\g<1>{CSRF_MARKER}\g<2>', response.content.decode(response.charset))
+            page_cache().set(key, content, settings.STORE_PAGE_CACHE_TIMEOUT)
+            response['X-Page-Cache'] = 'miss'
+        else:
+            response = HttpResponse()
+            response['X-Page-Cache'] = 'hit'
+        response.content = _personalize(content, request)
+        return response
+    return wrapper
@@ -0,0 +1,148 @@
+import os
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.utils import timezone
+from scipy import sparse
+
+from orders.models import OrderProduct
+from store.mining import basket_from_order_products
+
+
+class CooccurrenceRecommender:
+    """
+    Item-to-item recommender over a sparse product x product matrix
+    whose cells count (or, time-decayed, weigh) the orders in which both
+    products were bought.
+    """
+
+    def __init__(self, matrix, products):
+        self.matrix = matrix.tocsr()
+        self.products = np.asarray(products)  # sorted product ids, one per row/column
+
+    @classmethod
+    def from_basket(cls, basket, products):
+        counts = basket.astype(np.int32)
+        matrix = (counts.T @ counts).tocsr()
+        matrix.setdiag(0)
+        matrix.eliminate_zeros()
+        return cls(matrix, products)
+
+    @classmethod
+    def from_order_products(cls, queryset=None):
+        return cls.from_basket(*basket_from_order_products(queryset))
+
+    def save(self, directory):
+        """Write the model as plain .npy arrays so it can be memory-mapped."""
+        index_dtype = np.int32 if self.matrix.nnz < np.iinfo(np.int32).max else np.int64
+        np.save(os.path.join(directory, 'products.npy'), self.products.astype(np.int64))
+        np.save(os.path.join(directory, 'indptr.npy'), self.matrix.indptr.astype(index_dtype))
+        np.save(os.path.join(directory, 'indices.npy'), self.matrix.indices.astype(index_dtype))
+        np.save(os.path.join(directory, 'data.npy'), self.matrix.data)
+
+    @classmethod
+    def load(cls, directory):
+        """
+        Memory-map a saved model read-only. Every process mapping the same
+        files shares one copy of them through the OS page cache.
+        """
+        arrays = {
+            name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')
+            for name in ('products', 'indptr', 'indices', 'data')
+        }
+        size = len(arrays['products'])
+        matrix = sparse.csr_matrix(
+            (arrays['data'], arrays['indices'], arrays['indptr']),
+            shape=(size, size), copy=False,
+        )
+        return cls(matrix, arrays['products'])
+
+    def recommend(self, cart_product_ids, k=6):
+        """
+        Return up to k product ids, best first, scored by how often they
+        were bought with the cart's products. Cost depends on the cart's
+        rows, not on the size of the order history.
+        """
+        cart_product_ids = np.unique(np.asarray(list(cart_product_ids), dtype=np.int64))
+        if not len(cart_product_ids) or not len(self.products):
+            return []
+
+        # Rows of the cart products that the model knows about
+        rows = np.searchsorted(self.products, cart_product_ids)
+        rows = rows[rows < len(self.products)]
+        rows = rows[np.isin(self.products[rows], cart_product_ids)]
+        if not len(rows):
+            return []
+
+        scores = np.asarray(self.matrix[rows].sum(axis=0)).ravel()
+        scores[rows] = 0  # never recommend what is already in the cart
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[scores[top] > 0]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [int(pid) for pid in self.products[top]]
+
+
+def daily_pair_counts(day):
+    """
+    Co-occurrence of the orders placed on `day` (UTC), as three parallel
+    arrays: product id, other product id, number of orders.
+    """
+    start = datetime.combine(day, time.min, tzinfo=dt_timezone.utc)
+    queryset = OrderProduct.objects.filter(created_at__gte=start, created_at__lt=start + timedelta(days=1))
+    pairs = CooccurrenceRecommender.from_order_products(queryset)
+    matrix = pairs.matrix.tocoo()
+    return pairs.products[matrix.row], pairs.products[matrix.col], matrix.data
+
+
+def windowed_recommender(window_days, half_life_days=None, cache_dir=None, today=None):
+    """
+    Build the recommender from the last window_days of orders only,
+    weighting each day by 0.5 ** (age / half_life_days) when a half-life
+    is given.
+
+    With a cache_dir every finished day's counts are kept on disk, so a
+    rolling rebuild only reads the new days (and today, which is still
+    filling up) from the database and drops the days that left the window.
+    """
+    today = today or timezone.now().date()
+    days = [today - timedelta(days=age) for age in range(window_days)]
+
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        in_window = {f'{day}.npz' for day in days}
+        for name in os.listdir(cache_dir):
+            if name.endswith('.npz') and name not in in_window:
+                os.remove(os.path.join(cache_dir, name))
+
+    products, others, weights = [], [], []
+    for age, day in enumerate(days):
+        path = os.path.join(cache_dir, f'{day}.npz') if cache_dir else None
+        if age and path and os.path.exists(path):
+            with np.load(path) as saved:
+                product, other, count = saved['product'], saved['other'], saved['count']
+        else:
+            product, other, count = daily_pair_counts(day)
+            if age and path:
+                staging = f'{path}.tmp'
+                with open(staging, 'wb') as f:
+                    np.savez(f, product=product, other=other, count=count)
+                os.replace(staging, path)
+
+        decay = 0.5 ** (age / half_life_days) if half_life_days else 1.0
+        products.append(product)
+        others.append(other)
+        weights.append(count * decay)
+
+    product = np.concatenate(products) if products else np.empty(0, dtype=np.int64)
+    other = np.concatenate(others) if others else np.empty(0, dtype=np.int64)
+    weight = np.concatenate(weights) if weights else np.empty(0)
+
+    index = np.unique(np.concatenate([product, other]))
+    matrix = sparse.csr_matrix(
+        (weight.astype(np.float32), (np.searchsorted(index, product), np.searchsorted(index, other))),
+        shape=(len(index), len(index)),
+    )
+    matrix.sum_duplicates()
+    return CooccurrenceRecommender(matrix, index)
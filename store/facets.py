@@ -0,0 +1,86 @@
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Product, ProductFacet, Variation
+
+# (label, lowest price, highest price or None); the label is the stored value
+PRICE_BUCKETS = (
+    ('Under Rs. 500', 0, 499),
+    ('Rs. 500 - 999', 500, 999),
+    ('Rs. 1000 - 1999', 1000, 1999),
+    ('Rs. 2000 - 4999', 2000, 4999),
+    ('Rs. 5000 and above', 5000, None),
+)
+
+# Usual size order; other sizes are listed after these, alphabetically
+SIZE_ORDER = ('xs', 's', 'small', 'm', 'medium', 'l', 'large', 'xl', 'xxl')
+
+
+def size_sort_key(size):
+    size = size.lower()
+    return (SIZE_ORDER.index(size) if size in SIZE_ORDER else len(SIZE_ORDER), size)
+
+
+def price_bucket(price):
+    for label, low, high in PRICE_BUCKETS:
+        if price >= low and (high is None or price <= high):
+            return label
+    return PRICE_BUCKETS[0][0]
+
+
+def product_facet_rows(product):
+    rows = [
+        ProductFacet(product=product, facet='category', value=str(product.category_id)),
+        ProductFacet(product=product, facet='price', value=price_bucket(product.price)),
+    ]
+    sizes = (Variation.objects
+             .filter(product=product, variation_category='size', is_active=True)
+             .values_list('variation_value', flat=True)
+             .distinct())
+    rows.extend(ProductFacet(product=product, facet='size', value=size) for size in sizes)
+    return rows
+
+
+def refresh_product_facets(product):
+    """Rewrite one product's facet rows."""
+    with transaction.atomic():
+        ProductFacet.objects.filter(product=product).delete()
+        ProductFacet.objects.bulk_create(product_facet_rows(product))
+
+
+def rebuild_facets():
+    """Rewrite the whole facet table. Returns the number of rows written."""
+    rows = []
+    for product in Product.objects.iterator():
+        rows.extend(product_facet_rows(product))
+    with transaction.atomic():
+        ProductFacet.objects.all().delete()
+        ProductFacet.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def filter_by_facet(products, facet, values):
+    """Keep products having any of the values, as a semi-join (no .distinct() needed)."""
+    return products.filter(id__in=ProductFacet.objects
+                           .filter(facet=facet, value__in=values)
+                           .values('product_id'))
+
+
+def facet_counts(filtered):
+    """
+    Per-value product counts for each facet, one grouped query per facet.
+
+    filtered: facet name -> queryset of the products matching every
+    active filter except that facet's own, so a shopper can see how many
+    products another size or category would add.
+    Returns facet name -> {value: count}.
+    """
+    counts = {}
+    for facet, products in filtered.items():
+        rows = (ProductFacet.objects
+                .filter(facet=facet, product_id__in=products.values('id'))
+                .values('value')
+                .annotate(count=Count('product_id'))
+                .order_by())
+        counts[facet] = {row['value']: row['count'] for row in rows}
+    return counts
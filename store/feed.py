@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Product
+
+FEED_KEY = 'home_feed'
+
+# (key, heading) of each home page section, in page order
+SECTIONS = (
+    ('newest', 'New arrivals'),
+    ('best_selling', 'Best sellers'),
+    ('top_rated', 'Top rated'),
+)
+
+
+def compute_feed(size):
+    """Ids for each home section, at most `size` apiece."""
+    available = Product.objects.filter(is_available=True)
+    return {
+        'newest': list(available
+                       .order_by('-created_date', '-id')
+                       .values_list('id', flat=True)[:size]),
+        'best_selling': list(available
+                             .filter(order_count__count__gt=0)
+                             .order_by('-order_count__count', 'id')
+                             .values_list('id', flat=True)[:size]),
+        'top_rated': list(available
+                          .filter(rating_count__gt=0)
+                          .order_by('-rating_avg', '-rating_count', 'id')
+                          .values_list('id', flat=True)[:size]),
+    }
+
+
+def rebuild_home_feed():
+    feed = compute_feed(settings.HOME_FEED_SIZE)
+    cache.set(FEED_KEY, feed, settings.HOME_FEED_TIMEOUT)
+    return feed
+
+
+def invalidate_home_feed():
+    cache.delete(FEED_KEY)
+
+
+def home_feed():
+    """
+    [(key, heading, products)] for the home page. The id lists come from
+    the cache (recomputed when missing) and every section's products are
+    loaded together, with their categories, in one query.
+    """
+    feed = cache.get(FEED_KEY)
+    if feed is None:
+        feed = rebuild_home_feed()
+
+    ids = {pid for key, _ in SECTIONS for pid in feed.get(key, [])}
+    products = Product.objects.filter(is_available=True).select_related('category').in_bulk(ids)
+    return [(key, heading, [products[pid] for pid in feed.get(key, []) if pid in products])
+            for key, heading in SECTIONS]
@@ -0,0 +1,147 @@
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .caching import touch_product
+from .models import Product, ProductGallery
+
+logger = logging.getLogger(__name__)
+
+# (model, image field) pairs that get derivatives; the derivatives' URLs
+# and stored names are kept in the model's '<field>_variants' JSONField
+IMAGE_FIELDS = (
+    ('store.Product', 'images'),
+    ('store.ProductGallery', 'image'),
+    ('category.Category', 'cat_image'),
+    ('accounts.UserProfile', 'profile_picture'),
+)
+
+# Output formats: name -> (Pillow format, file extension, save options)
+FORMATS = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+DERIVED_DIR = 'derived'
+
+# Derivatives are made after the upload's transaction commits, off the request thread
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='images')
+
+
+def variants_field(field_name):
+    return f'{field_name}_variants'
+
+
+def derivative_name(source_name, width, extension):
+    stem = posixpath.splitext(source_name)[0]
+    return posixpath.join(DERIVED_DIR, f'{stem}-{width}w.{extension}')
+
+
+def make_variants(source_name, storage=default_storage):
+    """
+    Write thumbnails of the stored image at each IMAGE_VARIANT_WIDTHS width
+    (never wider than the original) in every format. Returns
+    {'source': source_name, 'webp': [[width, url], ...], 'jpeg': [...],
+    'files': [stored name, ...]}, or just the source when the file is
+    missing or not an image.
+    """
+    try:
+        with storage.open(source_name) as source:
+            original = ImageOps.exif_transpose(Image.open(source))
+            original.load()
+    except (FileNotFoundError, UnidentifiedImageError, OSError) as error:
+        logger.warning('No image variants for %s: %s', source_name, error)
+        return {'source': source_name}  # not retried until the image is replaced
+
+    widths = sorted({min(width, original.width) for width in settings.IMAGE_VARIANT_WIDTHS})
+    variants = {'source': source_name, 'files': []}
+    for name, (image_format, extension, options) in FORMATS.items():
+        variants[name] = []
+        for width in widths:
+            image = original.copy()
+            image.thumbnail((width, original.height), Image.LANCZOS)
+            if image_format == 'JPEG' and image.mode != 'RGB':
+                image = image.convert('RGB')
+            buffer = BytesIO()
+            image.save(buffer, image_format, **options)
+
+            path = storage.save(derivative_name(source_name, width, extension), ContentFile(buffer.getvalue()))
+            variants[name].append([width, storage.url(path)])
+            variants['files'].append(path)
+    return variants
+
+
+def is_stale(instance, field_name):
+    source = getattr(instance, field_name)
+    variants = getattr(instance, variants_field(field_name))
+    return bool(source) and variants.get('source') != source.name
+
+
+def used_elsewhere(source_name, model, pk):
+    """Whether an image other than this row's has source_name, and so shares its derivatives."""
+    for other, field_name in image_models():
+        rows = other.objects.filter(**{field_name: source_name})
+        if other is model:
+            rows = rows.exclude(pk=pk)
+        if rows.exists():
+            return True
+    return False
+
+
+def store_variants(model, pk, field_name, storage=default_storage):
+    """
+    Make the derivatives for one row and save their URLs, unless the image
+    was replaced meanwhile. Derivatives of the row's previous variants that
+    are no longer listed are deleted, unless another image still uses them.
+    """
+    row = model.objects.filter(pk=pk).values_list(field_name, variants_field(field_name)).first()
+    if not row or not row[0]:
+        return
+    source_name, previous = row
+    variants = make_variants(source_name, storage)
+    rows = model.objects.filter(pk=pk, **{field_name: source_name})
+    if not rows.update(**{variants_field(field_name): variants}):
+        return
+
+    old_files = set((previous or {}).get('files', ())) - set(variants.get('files', ()))
+    if old_files and not used_elsewhere(previous['source'], model, pk):
+        for name in old_files:
+            storage.delete(name)
+
+    # Let cached product pages and fragments pick the thumbnails up
+    if model is Product:
+        touch_product(pk)
+    elif model is ProductGallery:
+        touch_product(rows.values_list('product_id', flat=True).first())
+
+
+def _store_variants_in_thread(model, pk, field_name):
+    try:
+        store_variants(model, pk, field_name)
+    except Exception:
+        logger.exception('Image variants failed for %s %s', model.__name__, pk)
+    finally:
+        connections.close_all()  # only closes this worker thread's connections
+
+
+def schedule_variants(sender, instance, **kwargs):
+    """post_save receiver: queue derivatives for a new or replaced image."""
+    for label, field_name in IMAGE_FIELDS:
+        if apps.get_model(label) is sender and is_stale(instance, field_name):
+            transaction.on_commit(
+                lambda pk=instance.pk, field_name=field_name: _executor.submit(
+                    _store_variants_in_thread, sender, pk, field_name)
+            )
+
+
+def image_models():
+    """(model, field name) for every image field with derivatives."""
+    return [(apps.get_model(label), field_name) for label, field_name in IMAGE_FIELDS]
@@ -0,0 +1,112 @@
+"""
+Frequent itemset counting on sparse orders x products baskets.
+
+Kept free of Django imports so process pool workers can load it
+whatever the multiprocessing start method.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+
+def _order_lists(basket):
+    """CSC copy of the basket, whose column slices are sorted order (row) lists."""
+    columns = basket.tocsc()
+    columns.sort_indices()
+    return columns
+
+
+def _column_orders(columns, col):
+    return columns.indices[columns.indptr[col]:columns.indptr[col + 1]]
+
+
+def sparse_apriori(basket, min_support=0.01, max_len=None):
+    """
+    Apriori over the sparse basket using order id lists.
+
+    Every frequent itemset keeps the sorted array of orders containing it;
+    a candidate's orders are the intersection of its two parents', so
+    memory stays proportional to the frequent itemsets, not the matrix.
+    Returns a DataFrame with 'support' and 'itemsets' (column positions).
+    """
+    n_orders = basket.shape[0]
+    columns = _order_lists(basket)
+
+    supports = np.diff(columns.indptr) / n_orders
+    level = {
+        (col,): _column_orders(columns, col)
+        for col in np.flatnonzero(supports >= min_support)
+    }
+    found = [(len(orders) / n_orders, itemset) for itemset, orders in level.items()]
+
+    size = 1
+    while level and (max_len is None or size < max_len):
+        candidates = {}
+        itemsets = sorted(level)
+        for i, left in enumerate(itemsets):
+            for right in itemsets[i + 1:]:
+                # Join itemsets sharing everything but their last item
+                if left[:-1] != right[:-1]:
+                    break
+                candidate = left + right[-1:]
+                # Prune when any subset of the candidate is not frequent
+                if any(candidate[:j] + candidate[j + 1:] not in level for j in range(size - 1)):
+                    continue
+                orders = np.intersect1d(level[left], level[right], assume_unique=True)
+                if len(orders) / n_orders >= min_support:
+                    candidates[candidate] = orders
+        level = candidates
+        found.extend((len(orders) / n_orders, itemset) for itemset, orders in level.items())
+        size += 1
+
+    return pd.DataFrame({
+        'support': [support for support, _ in found],
+        'itemsets': [frozenset(int(col) for col in itemset) for _, itemset in found],
+    })
+
+
+def count_itemsets(basket, itemsets):
+    """Number of orders (rows) of the basket containing each itemset."""
+    columns = _order_lists(basket)
+    counts = np.zeros(len(itemsets), dtype=np.int64)
+    for i, itemset in enumerate(itemsets):
+        orders = _column_orders(columns, itemset[0])
+        for col in itemset[1:]:
+            orders = np.intersect1d(orders, _column_orders(columns, col), assume_unique=True)
+        counts[i] = len(orders)
+    return counts
+
+
+def _local_itemsets(shard, min_support):
+    if shard.shape[0] == 0:
+        return []
+    return [tuple(sorted(itemset)) for itemset in sparse_apriori(shard, min_support=min_support)['itemsets']]
+
+
+def partitioned_apriori(basket, min_support=0.01, workers=2):
+    """
+    Partitioned (SON) Apriori over `workers` order shards in parallel.
+
+    An itemset frequent in the whole basket is frequent in at least one
+    shard, so the union of every shard's local itemsets is a complete
+    candidate list. The candidates are then counted exactly on every
+    shard and the integer counts summed, which makes the result identical
+    to sparse_apriori whatever the number of workers.
+    """
+    n_orders = basket.shape[0]
+    basket = basket.tocsr()
+    shards = [basket[shard::workers] for shard in range(workers)]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        local = pool.map(_local_itemsets, shards, [min_support] * workers)
+        candidates = sorted(set().union(*local), key=lambda itemset: (len(itemset), itemset))
+        counts = sum(pool.map(count_itemsets, shards, [candidates] * workers), np.zeros(len(candidates), dtype=np.int64))
+
+    supports = counts / n_orders
+    frequent = supports >= min_support
+    return pd.DataFrame({
+        'support': supports[frequent],
+        'itemsets': [frozenset(int(col) for col in itemset)
+                     for itemset, keep in zip(candidates, frequent) if keep],
+    })
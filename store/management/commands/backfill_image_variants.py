@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from store.images import image_models, is_stale, store_variants
+
+
+class Command(BaseCommand):
+    help = 'Make the thumbnail and WebP variants for images uploaded before they existed, or for all with --force.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Remake the variants of every image.')
+
+    def handle(self, *args, **options):
+        for model, field_name in image_models():
+            done = 0
+            for instance in model.objects.exclude(**{field_name: ''}).iterator():
+                if options['force'] or is_stale(instance, field_name):
+                    store_variants(model, instance.pk, field_name)
+                    done += 1
+            self.stdout.write(f'{model._meta.verbose_name_plural}: {done} images')
+        self.stdout.write(self.style.SUCCESS('Image variants are up to date.'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from store.models import Product, rating_fields
+
+
+class Command(BaseCommand):
+    help = 'Recompute every product\'s stored rating average and count from its active reviews.'
+
+    def handle(self, *args, **options):
+        updated = Product.objects.update(**rating_fields())
+        self.stdout.write(self.style.SUCCESS(f'Updated ratings of {updated} products.'))
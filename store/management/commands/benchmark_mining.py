@@ -0,0 +1,85 @@
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+
+from store.mining import ALGORITHMS, FPGROWTH_MAX_CELLS, build_basket, mine_frequent_itemsets
+
+
+def synthetic_history(orders, products, seed=0):
+    """
+    Random (order_id, product_id) lines: 1-5 items per order,
+    product popularity following a Zipf-like curve.
+    """
+    rng = np.random.default_rng(seed)
+    sizes = rng.integers(1, 6, size=orders)
+    order_ids = np.repeat(np.arange(orders), sizes)
+    popularity = 1.0 / np.arange(1, products + 1)
+    product_ids = rng.choice(products, size=len(order_ids), p=popularity / popularity.sum())
+    return order_ids, product_ids
+
+
+def dense_basket(order_ids, product_ids):
+    """The previous pandas groupby/unstack/elementwise basket, kept for comparison."""
+    df = pd.DataFrame({'order_id': order_ids, 'product_id': product_ids})
+    basket = df.groupby(['order_id', 'product_id']).size().unstack(fill_value=0)
+    return basket.map(lambda x: 1 if x > 0 else 0)
+
+
+def measure(func, *args, **kwargs):
+    """Return (result, seconds, peak traced MB) for one call."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 2 ** 20
+
+
+class Command(BaseCommand):
+    help = 'Compare time and memory of the dense and sparse basket builders and the mining algorithms on synthetic order histories.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, nargs='+', default=[10000, 100000, 1000000])
+        parser.add_argument('--products', type=int, default=500)
+        parser.add_argument('--min-support', type=float, default=0.01)
+        parser.add_argument('--dense-limit-mb', type=float, default=2048,
+                            help='Skip the dense builder when its estimated matrix is larger than this.')
+
+    def handle(self, *args, **options):
+        header = f"{'orders':>9}  {'step':<18} {'seconds':>9} {'peak MB':>9}  notes"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+
+        for orders in options['orders']:
+            order_ids, product_ids = synthetic_history(orders, options['products'])
+
+            # int64 cells for the unstacked frame, plus the elementwise copy
+            dense_mb = 2 * orders * options['products'] * 8 / 2 ** 20
+            if dense_mb > options['dense_limit_mb']:
+                self.row(orders, 'dense basket', None, None, f'skipped, needs ~{dense_mb:,.0f} MB')
+            else:
+                _, seconds, peak = measure(dense_basket, order_ids, product_ids)
+                self.row(orders, 'dense basket', seconds, peak)
+
+            (basket, products), seconds, peak = measure(build_basket, order_ids, product_ids)
+            self.row(orders, 'sparse basket', seconds, peak, f'{basket.nnz:,} cells set')
+
+            for algorithm in ALGORITHMS:
+                if algorithm == 'fpgrowth' and orders * options['products'] > FPGROWTH_MAX_CELLS:
+                    # mlxtend's FP-Growth densifies the basket internally
+                    self.row(orders, f'{algorithm} (sparse)', None, None, 'skipped, basket too large to densify')
+                    continue
+                itemsets, seconds, peak = measure(
+                    mine_frequent_itemsets, basket, products,
+                    min_support=options['min_support'], algorithm=algorithm,
+                )
+                self.row(orders, f'{algorithm} (sparse)', seconds, peak, f'{len(itemsets)} itemsets')
+
+    def row(self, orders, step, seconds, peak, notes=''):
+        seconds = '-' if seconds is None else f'{seconds:.2f}'
+        peak = '-' if peak is None else f'{peak:.1f}'
+        self.stdout.write(f'{orders:>9,}  {step:<18} {seconds:>9} {peak:>9}  {notes}')
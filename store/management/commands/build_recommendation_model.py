@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from store.artifacts import daily_counts_dir, publish_model
+from store.cooccurrence import CooccurrenceRecommender, windowed_recommender
+
+
+class Command(BaseCommand):
+    help = 'Build the item-to-item co-occurrence model from the order history and publish it for the workers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep', type=int, default=3, help='Number of published versions to keep on disk.')
+        parser.add_argument('--window-days', type=int,
+                            help='Only use the last N days of orders (0 = whole history). '
+                                 'Defaults to settings.RECOMMENDATION_WINDOW_DAYS.')
+        parser.add_argument('--half-life-days', type=float,
+                            help='Halve the weight of older days every N days (0 = no decay). '
+                                 'Defaults to settings.RECOMMENDATION_HALF_LIFE_DAYS.')
+
+    def handle(self, *args, **options):
+        window_days = options['window_days']
+        if window_days is None:
+            window_days = settings.RECOMMENDATION_WINDOW_DAYS
+        half_life_days = options['half_life_days']
+        if half_life_days is None:
+            half_life_days = settings.RECOMMENDATION_HALF_LIFE_DAYS
+
+        if window_days:
+            recommender = windowed_recommender(window_days, half_life_days, cache_dir=daily_counts_dir())
+        else:
+            recommender = CooccurrenceRecommender.from_order_products()
+
+        version = publish_model(recommender, keep=options['keep'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Published model {version} ({len(recommender.products)} products, {recommender.matrix.nnz} pairs).'))
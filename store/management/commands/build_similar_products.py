@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from store.similarity import rebuild_similar_products
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the content-based "similar items" index from product names, descriptions and categories.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=6, help='Neighbours stored per product.')
+
+    def handle(self, *args, **options):
+        count = rebuild_similar_products(top_k=options['top_k'])
+        self.stdout.write(self.style.SUCCESS(f'Stored {count} similar product pairs.'))
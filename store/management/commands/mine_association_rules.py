@@ -0,0 +1,42 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from store.mining import ALGORITHMS
+from store.recommendations import rebuild_association_rules
+
+
+class Command(BaseCommand):
+    help = 'Mine the order history and rebuild the association rule index used by the cart.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-support', type=float, default=0.01)
+        parser.add_argument('--min-lift', type=float, default=1.0)
+        parser.add_argument('--algorithm', choices=sorted(ALGORITHMS),
+                            help='Defaults to settings.RECOMMENDATION_MINING_ALGORITHM.')
+        parser.add_argument('--top-k', type=int, default=4,
+                            help='Length of each product\'s "frequently bought together" list.')
+        parser.add_argument('--window-days', type=int,
+                            help='Only mine the last N days of orders (0 = whole history). '
+                                 'Defaults to settings.RECOMMENDATION_WINDOW_DAYS.')
+        parser.add_argument('--workers', type=int,
+                            help='Processes counting itemsets in parallel; use 0 for every CPU core. '
+                                 'Defaults to settings.RECOMMENDATION_MINING_WORKERS.')
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        if workers == 0:
+            workers = os.cpu_count()
+
+        try:
+            count = rebuild_association_rules(
+                min_support=options['min_support'],
+                min_lift=options['min_lift'],
+                algorithm=options['algorithm'],
+                top_k=options['top_k'],
+                window_days=options['window_days'],
+                workers=workers,
+            )
+        except ValueError as e:
+            raise CommandError(e)
+        self.stdout.write(self.style.SUCCESS(f'Stored {count} association rules.'))
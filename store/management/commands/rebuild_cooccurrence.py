@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from store.recommendations import rebuild_cooccurrence
+
+
+class Command(BaseCommand):
+    help = 'Recount the product co-occurrence counters from the whole order history.'
+
+    def handle(self, *args, **options):
+        orders = rebuild_cooccurrence()
+        self.stdout.write(self.style.SUCCESS(f'Counted {orders} orders.'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from store.facets import rebuild_facets
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the product facet table behind the store filters and their counts.'
+
+    def handle(self, *args, **options):
+        count = rebuild_facets()
+        self.stdout.write(self.style.SUCCESS(f'Stored {count} product facets.'))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from store.feed import SECTIONS, rebuild_home_feed
+
+
+class Command(BaseCommand):
+    help = 'Recompute the home page sections (newest, best selling, top rated). Run it on a schedule.'
+
+    def handle(self, *args, **options):
+        feed = rebuild_home_feed()
+        counts = ', '.join(f'{key}: {len(feed[key])}' for key, _ in SECTIONS)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt the home feed ({counts}).'))
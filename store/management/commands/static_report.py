@@ -0,0 +1,52 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Compressed copies collectstatic writes next to each file
+ENCODINGS = (('gzip', '.gz'), ('brotli', '.br'))
+
+
+class Command(BaseCommand):
+    help = 'Check the output of collectstatic: hashed names, and bytes saved by the gzip/brotli copies. Run it after collectstatic.'
+
+    def handle(self, *args, **options):
+        root = settings.STATIC_ROOT
+        manifest = os.path.join(root, 'staticfiles.json')
+        if not os.path.exists(manifest):
+            raise CommandError(f'No {manifest}: run collectstatic with DEBUG off first.')
+        with open(manifest) as f:
+            hashed = set(json.load(f)['paths'].values())
+
+        files = original = best = 0
+        saved = {encoding: 0 for encoding, _ in ENCODINGS}
+        copies = {encoding: 0 for encoding, _ in ENCODINGS}
+        for directory, _, names in os.walk(root):
+            for name in names:
+                path = os.path.join(directory, name)
+                if os.path.relpath(path, root).replace(os.sep, '/') not in hashed:
+                    continue  # only the hashed copies are served to browsers
+                size = os.path.getsize(path)
+                smallest = size
+                for encoding, extension in ENCODINGS:
+                    if os.path.exists(path + extension):
+                        compressed = os.path.getsize(path + extension)
+                        saved[encoding] += size - compressed
+                        copies[encoding] += 1
+                        smallest = min(smallest, compressed)
+                files += 1
+                original += size
+                best += smallest
+
+        if not files:
+            raise CommandError(f'None of the {len(hashed)} hashed files in the manifest are in {root}.')
+        for encoding, _ in ENCODINGS:
+            if copies[encoding]:
+                self.stdout.write(f'{encoding}: {copies[encoding]} files, {saved[encoding]} bytes saved')
+            else:
+                self.stdout.write(self.style.WARNING(f'{encoding}: no compressed copies'))
+        self.stdout.write(self.style.SUCCESS(
+            f'{files} hashed files, {original} bytes; served compressed: {best} bytes '
+            f'({original - best} saved, {100 * (original - best) / original:.1f}%).'
+        ))
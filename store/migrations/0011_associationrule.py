@@ -0,0 +1,29 @@
+# Generated by Django 4.2 on 2026-10-18 13:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0010_remove_state_country_delete_city_delete_country_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssociationRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('support', models.FloatField()),
+                ('confidence', models.FloatField()),
+                ('lift', models.FloatField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('antecedent', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rules_as_antecedent', to='store.product')),
+                ('consequent', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rules_as_consequent', to='store.product')),
+            ],
+            options={
+                'unique_together': {('antecedent', 'consequent')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 14:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0012_cooccurrence_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recommendationstats',
+            name='rules_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
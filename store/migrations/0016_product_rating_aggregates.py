@@ -0,0 +1,46 @@
+# Generated by Django 4.2 on 2026-10-18 14:26
+
+from django.db import migrations, models
+from django.db.models import Avg, Count, FloatField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+# store.models.rating_fields() as of this migration, copied so later
+# changes to it do not change what this migration does
+def fill_ratings(apps, schema_editor):
+    Product = apps.get_model('store', 'Product')
+    ReviewRating = apps.get_model('store', 'ReviewRating')
+
+    reviews = (ReviewRating.objects
+               .filter(product=OuterRef('pk'), status=True)
+               .order_by()
+               .values('product'))
+    Product.objects.update(
+        rating_avg=Coalesce(
+            Subquery(reviews.annotate(average=Avg('rating')).values('average')),
+            Value(0.0), output_field=FloatField()),
+        rating_count=Coalesce(
+            Subquery(reviews.annotate(count=Count('id')).values('count')),
+            Value(0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0015_similarproduct'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_avg',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_ratings, migrations.RunPython.noop),
+    ]
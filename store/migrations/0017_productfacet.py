@@ -0,0 +1,65 @@
+# Generated by Django 4.2 on 2026-10-18 14:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Price buckets as of this migration; store.facets.PRICE_BUCKETS may change later
+PRICE_BUCKETS = (
+    ('Under Rs. 500', 0, 499),
+    ('Rs. 500 - 999', 500, 999),
+    ('Rs. 1000 - 1999', 1000, 1999),
+    ('Rs. 2000 - 4999', 2000, 4999),
+    ('Rs. 5000 and above', 5000, None),
+)
+
+
+def price_bucket(price):
+    for label, low, high in PRICE_BUCKETS:
+        if price >= low and (high is None or price <= high):
+            return label
+    return PRICE_BUCKETS[0][0]
+
+
+def fill_facets(apps, schema_editor):
+    Product = apps.get_model('store', 'Product')
+    Variation = apps.get_model('store', 'Variation')
+    ProductFacet = apps.get_model('store', 'ProductFacet')
+
+    rows = []
+    for product in Product.objects.iterator():
+        rows.append(ProductFacet(product_id=product.id, facet='category', value=str(product.category_id)))
+        rows.append(ProductFacet(product_id=product.id, facet='price', value=price_bucket(product.price)))
+    sizes = (Variation.objects
+             .filter(variation_category='size', is_active=True)
+             .values_list('product_id', 'variation_value')
+             .distinct())
+    rows.extend(ProductFacet(product_id=product_id, facet='size', value=size) for product_id, size in sizes)
+    ProductFacet.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0016_product_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facet', models.CharField(max_length=20)),
+                ('value', models.CharField(max_length=100)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='facets', to='store.product')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='productfacet',
+            index=models.Index(fields=['facet', 'value'], name='store_produ_facet_3bcb4f_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='productfacet',
+            unique_together={('product', 'facet', 'value')},
+        ),
+        migrations.RunPython(fill_facets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+from django.db import migrations
+
+# The index each database gets, as of this migration. store.search keeps
+# it current afterwards; the statements are copied here so later changes
+# to the backends do not change what this migration does.
+
+SQLITE_INSTALL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS store_product_fts "
+    "USING fts5(product_name, description, tokenize='porter unicode61')",
+    "INSERT INTO store_product_fts(rowid, product_name, description) "
+    "SELECT id, product_name, description FROM store_product",
+)
+SQLITE_UNINSTALL = (
+    'DROP TABLE IF EXISTS store_product_fts',
+)
+
+POSTGRES_INSTALL = (
+    "CREATE INDEX IF NOT EXISTS store_product_search_idx ON store_product USING GIN (("
+    "setweight(to_tsvector('english', coalesce(product_name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B')))",
+)
+POSTGRES_UNINSTALL = (
+    'DROP INDEX IF EXISTS store_product_search_idx',
+)
+
+STATEMENTS = {
+    'sqlite': (SQLITE_INSTALL, SQLITE_UNINSTALL),
+    'postgresql': (POSTGRES_INSTALL, POSTGRES_UNINSTALL),
+}
+
+
+def run(schema_editor, which):
+    # Other databases have no index: their search scans the table
+    statements = STATEMENTS.get(schema_editor.connection.vendor)
+    if statements:
+        for sql in statements[which]:
+            schema_editor.execute(sql)
+
+
+def create_search_index(apps, schema_editor):
+    run(schema_editor, 0)
+
+
+def drop_search_index(apps, schema_editor):
+    run(schema_editor, 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0017_productfacet'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
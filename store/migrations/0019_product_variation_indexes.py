@@ -0,0 +1,21 @@
+# Generated by Django 4.2 on 2026-10-18 14:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0018_product_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_available', 'category', 'price'], name='store_produ_is_avai_71b826_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='variation',
+            index=models.Index(fields=['product', 'variation_category', 'variation_value'], name='store_varia_product_4b8dec_idx'),
+        ),
+    ]
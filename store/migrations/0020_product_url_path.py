@@ -0,0 +1,28 @@
+# Generated by Django 4.2 on 2026-10-18 14:42
+
+from django.db import migrations, models
+from django.urls import reverse
+
+
+def fill_url_paths(apps, schema_editor):
+    Product = apps.get_model('store', 'Product')
+    products = list(Product.objects.select_related('category'))
+    for product in products:
+        product.url_path = reverse('product_detail', args=[product.category.slug, product.slug])
+    Product.objects.bulk_update(products, ['url_path'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0019_product_variation_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='url_path',
+            field=models.CharField(blank=True, editable=False, max_length=320),
+        ),
+        migrations.RunPython(fill_url_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2 on 2026-10-18 14:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0020_product_url_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='images_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='productgallery',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,81 @@
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+from mlxtend.frequent_patterns import fpgrowth
+from scipy import sparse
+
+from orders.models import OrderProduct
+from store.itemsets import partitioned_apriori, sparse_apriori
+
+ALGORITHMS = ('apriori', 'fpgrowth')
+
+# mlxtend's FP-Growth works on a dense copy of the basket, one byte per
+# orders x products cell; larger baskets are refused instead of exhausting memory
+FPGROWTH_MAX_CELLS = 100_000_000
+
+
+def build_basket(order_ids, product_ids):
+    """
+    Build a boolean orders x products CSR matrix from two parallel id arrays.
+
+    Returns (basket, products) where products[j] is the product id of column j.
+    Memory is O(order lines), never O(orders x products).
+    """
+    orders, rows = np.unique(np.asarray(order_ids), return_inverse=True)
+    products, cols = np.unique(np.asarray(product_ids), return_inverse=True)
+
+    basket = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=bool), (rows, cols)),
+        shape=(len(orders), len(products)),
+    )
+    basket.sum_duplicates()
+    return basket, products
+
+
+def basket_from_order_products(queryset=None):
+    """Build the sparse basket straight from OrderProduct (order_id, product_id) rows."""
+    if queryset is None:
+        queryset = OrderProduct.objects.all()
+
+    rows = queryset.values_list('order_id', 'product_id').iterator(chunk_size=10000)
+    pairs = np.fromiter(chain.from_iterable(rows), dtype=np.int64).reshape(-1, 2)
+    return build_basket(pairs[:, 0], pairs[:, 1])
+
+
+def mine_frequent_itemsets(basket, products, min_support=0.01, algorithm='apriori', workers=1):
+    """
+    Run sparse Apriori or FP-Growth on the basket. FP-Growth refuses
+    baskets over FPGROWTH_MAX_CELLS cells with a ValueError.
+    Itemsets are returned as frozensets of product ids, smallest first
+    and then by product ids, so the result never depends on `workers`.
+
+    workers: with more than one, Apriori counts itemsets on that many
+    order shards in separate processes and merges the counts
+    """
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f'Unknown mining algorithm: {algorithm}')
+    if workers > 1 and algorithm != 'apriori':
+        raise ValueError('Parallel mining is only available with the apriori algorithm')
+    cells = basket.shape[0] * basket.shape[1]
+    if algorithm == 'fpgrowth' and cells > FPGROWTH_MAX_CELLS:
+        raise ValueError(f'FP-Growth would densify the {basket.shape[0]} x {basket.shape[1]} basket '
+                         f'({cells:,} cells, over {FPGROWTH_MAX_CELLS:,}); use the apriori algorithm')
+
+    if basket.shape[0] == 0:
+        return pd.DataFrame(columns=['support', 'itemsets'])
+
+    if algorithm == 'apriori' and workers > 1:
+        itemsets = partitioned_apriori(basket, min_support=min_support, workers=workers)
+    elif algorithm == 'apriori':
+        itemsets = sparse_apriori(basket, min_support=min_support)
+    else:
+        # Columns stay positional (mlxtend needs sparse integer labels to start at 0)
+        df = (pd.DataFrame.sparse.from_spmatrix(basket.astype(np.uint8))
+                .astype(pd.SparseDtype(bool, False)))
+        itemsets = fpgrowth(df, min_support=min_support)
+
+    itemsets['itemsets'] = [frozenset(int(products[col]) for col in itemset) for itemset in itemsets['itemsets']]
+    order = sorted(range(len(itemsets)), key=lambda i: (len(itemsets['itemsets'].iat[i]),
+                                                        sorted(itemsets['itemsets'].iat[i])))
+    return itemsets.iloc[order].reset_index(drop=True)
@@ -1,11 +1,36 @@
-from django.db import models
+from django.db import models, transaction
 from category.models import Category
 from django.urls import reverse
 from accounts.models import Account
-from django.db.models import Avg, Count
+from django.db.models import Avg, Count, FloatField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 
 # Create your models here.
 
+def is_stock_update(update_fields):
+    """
+    True for a Product save limited to its stock level, such as an order
+    lowering it. Product.save() always adds url_path to update_fields.
+    """
+    return update_fields is not None and set(update_fields) <= {'stock', 'url_path'}
+
+
+def rating_fields():
+    """
+    rating_avg and rating_count for Product.objects.update(), computed from
+    each product's active reviews, so any number of products take one query.
+    """
+    reviews = (ReviewRating.objects
+               .filter(product=OuterRef('pk'), status=True)
+               .order_by()
+               .values('product'))
+    return {
+        'rating_avg': Coalesce(Subquery(reviews.annotate(average=Avg('rating')).values('average')),
+                               Value(0.0), output_field=FloatField()),
+        'rating_count': Coalesce(Subquery(reviews.annotate(count=Count('id')).values('count')), Value(0)),
+    }
+
+
 class Product(models.Model):
     product_name        = models.CharField(max_length=200, unique=True)
     slug                = models.SlugField(max_length=200, unique=True)
@@ -17,26 +42,52 @@ class Product(models.Model):
     category            = models.ForeignKey(Category, on_delete=models.CASCADE) # CASCADE does when we delete category, the products attached with that category will be deleted
     created_date        = models.DateTimeField(auto_now_add=True)
     modified_date       = models.DateTimeField(auto_now=True)
+    rating_avg          = models.FloatField(default=0) # kept in sync with active reviews by store.signals
+    rating_count        = models.PositiveIntegerField(default=0)
+    url_path            = models.CharField(max_length=320, blank=True, editable=False) # get_url(), kept current on save and when the category's slug changes
+    images_variants     = models.JSONField(default=dict, blank=True, editable=False) # thumbnail URLs, written by store.images
 
-    def get_url(self):
+    class Meta:
+        indexes = [
+            # store listing: available products of a category, by price
+            models.Index(fields=['is_available', 'category', 'price']),
+            # default listing: available products in id order, without stepping over the others
+            models.Index(fields=['id'], condition=models.Q(is_available=True), name='store_product_available_idx'),
+        ]
+
+    def build_url_path(self):
         return reverse('product_detail', args=[self.category.slug, self.slug])
 
+    def get_url(self):
+        return self.url_path or self.build_url_path()
+
+    def save(self, *args, **kwargs):
+        self.url_path = self.build_url_path()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'url_path'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.product_name
 
     def averageReview(self):
-        reviews = ReviewRating.objects.filter(product=self, status=True).aggregate(average=Avg('rating'))
-        avg = 0
-        if reviews['average'] is not None:
-            avg = float(reviews['average'])
-        return avg
+        return self.rating_avg
 
     def countReview(self):
-        reviews = ReviewRating.objects.filter(product=self, status=True).aggregate(count=Count('id'))
-        count = 0
-        if reviews['count'] is not None:
-            count = int(reviews['count'])
-        return count
+        return self.rating_count
+
+    def update_rating(self):
+        """
+        Recompute rating_avg/rating_count from the active reviews.
+        The product row is locked first so concurrent reviews are applied
+        one after the other.
+        """
+        with transaction.atomic():
+            rows = Product.objects.filter(pk=self.pk)
+            rows.select_for_update().exists()
+            rows.update(**rating_fields())
+            self.rating_avg, self.rating_count = rows.values_list('rating_avg', 'rating_count').get()
 
 
 class VariationManager(models.Manager):
@@ -62,6 +113,12 @@ class Variation(models.Model):
 
     objects = VariationManager()
 
+    class Meta:
+        indexes = [
+            # add to cart: a product's variation by category and value
+            models.Index(fields=['product', 'variation_category', 'variation_value']),
+        ]
+
     def __str__(self):
         return self.variation_value
 
@@ -83,6 +140,7 @@ class ReviewRating(models.Model):
 class ProductGallery(models.Model):
     product = models.ForeignKey(Product, default=None, on_delete=models.CASCADE)
     image = models.ImageField(upload_to='store/products', max_length=255)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
 
     def __str__(self):
         return self.product.product_name
@@ -90,3 +148,120 @@ class ProductGallery(models.Model):
     class Meta:
         verbose_name = 'productgallery'
         verbose_name_plural = 'product gallery'
+
+
+class AssociationRule(models.Model):
+    """
+    Mined antecedent -> consequent rule, one row per product pair.
+    Rebuilt offline by the `mine_association_rules` command.
+    """
+    antecedent = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='rules_as_antecedent')
+    consequent = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='rules_as_consequent')
+    support = models.FloatField()
+    confidence = models.FloatField()
+    lift = models.FloatField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('antecedent', 'consequent')
+
+    def __str__(self):
+        return f'{self.antecedent_id} -> {self.consequent_id}'
+
+
+class ProductOrderCount(models.Model):
+    """Number of completed orders that contained the product."""
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='order_count')
+    count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.product_id}: {self.count}'
+
+
+class ProductCooccurrence(models.Model):
+    """
+    Number of completed orders that contained both products.
+    Stored in both directions so a cart can be looked up by `product`.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='cooccurrences')
+    other = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('product', 'other')
+
+    def __str__(self):
+        return f'{self.product_id} & {self.other_id}: {self.count}'
+
+
+class RecommendationStats(models.Model):
+    """
+    Single row holding the totals the co-occurrence metrics are derived
+    from, and the version of the mined association rules.
+    """
+    order_count = models.PositiveIntegerField(default=0)
+    rules_version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'recommendation stats'
+
+    @classmethod
+    def load(cls):
+        stats, _ = cls.objects.get_or_create(pk=1)
+        return stats
+
+
+class FrequentlyBoughtTogether(models.Model):
+    """
+    Top-k cross-sell list per product, ranked from the association rules.
+    Refreshed in batch together with the rules.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='bought_together')
+    recommended = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    confidence = models.FloatField()
+    lift = models.FloatField()
+
+    class Meta:
+        unique_together = ('product', 'rank')
+        ordering = ['product', 'rank']
+        verbose_name_plural = 'frequently bought together'
+
+    def __str__(self):
+        return f'{self.product_id} + {self.recommended_id}'
+
+
+class SimilarProduct(models.Model):
+    """
+    Top-k content neighbours per product, from name, description and
+    category. Rebuilt in batch by the `build_similar_products` command.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='similar_products')
+    similar = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        unique_together = ('product', 'rank')
+        ordering = ['product', 'rank']
+
+    def __str__(self):
+        return f'{self.product_id} ~ {self.similar_id}'
+
+
+class ProductFacet(models.Model):
+    """
+    One (facet, value) a product can be filtered by: its category, each
+    active size and its price bucket. Kept in sync by store.signals.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='facets')
+    facet = models.CharField(max_length=20)
+    value = models.CharField(max_length=100)
+
+    class Meta:
+        unique_together = ('product', 'facet', 'value')
+        indexes = [models.Index(fields=['facet', 'value'])]
+
+    def __str__(self):
+        return f'{self.facet}={self.value}'
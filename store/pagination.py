@@ -0,0 +1,232 @@
+import base64
+import hashlib
+import json
+import math
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+# Listing orders: sort name -> (field, descending, label). Every order ends
+# on id in the same direction, so (value, id) is unique and rows never
+# shift between pages.
+SORTS = {
+    'default': ('id', False, 'Featured'),
+    'newest': ('created_date', True, 'Newest'),
+    'price_low': ('price', False, 'Price: low to high'),
+    'price_high': ('price', True, 'Price: high to low'),
+    'rating': ('rating_avg', True, 'Top rated'),
+}
+
+# Sort fields whose cursor value is an ISO datetime; the others are numbers
+DATETIME_FIELDS = {'created_date'}
+
+# Largest integer the database compares against (signed 64-bit)
+MAX_INT = 2 ** 63 - 1
+
+
+def is_number(value):
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, int):
+        return abs(value) <= MAX_INT
+    return isinstance(value, float) and math.isfinite(value)
+
+
+def encode_cursor(data):
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """The cursor's data, or None when it is malformed."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(data, dict) or not isinstance(data.get('number'), int) or 'value' not in data:
+        return None
+    if not isinstance(data.get('id'), int) or not is_number(data['id']):
+        return None
+    return data
+
+
+def cursor_value(field, value):
+    """A cursor's value as the sort field's type, or None when it is not one."""
+    if field in DATETIME_FIELDS:
+        if not isinstance(value, str):
+            return None
+        try:
+            return parse_datetime(value)
+        except ValueError:
+            return None  # well formed but out of range, e.g. month 13
+    return value if is_number(value) else None
+
+
+def cached_count(queryset, timeout=60):
+    """
+    queryset.count(), cached for `timeout` seconds per distinct query.
+    The total shown on deep pages may lag behind by up to that long.
+    """
+    key = 'count:' + hashlib.md5(str(queryset.query).encode()).hexdigest()
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, timeout)
+    return count
+
+
+class BasePage:
+    """Links shared by the listing pages; subclasses set the page state."""
+
+    sort_options = None
+
+    def _query(self, **params):
+        query = self.params.copy()
+        for name, value in params.items():
+            query[name] = value
+        return query.urlencode()
+
+    @property
+    def page_links(self):
+        """(number, query) for the numbered pages."""
+        return [(number, self._query(page=number))
+                for number in range(1, min(self.num_pages, self.number_limit) + 1)]
+
+    def has_other_pages(self):
+        return self.has_previous or self.has_next
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class NumberedPage(BasePage):
+    """
+    One page of a listing that can only be paged by number, such as
+    search results in relevance order. object_list may be anything
+    Paginator accepts.
+    """
+
+    def __init__(self, request, object_list, per_page):
+        self.params = request.GET.copy()
+        for name in ('page', 'cursor'):
+            self.params.pop(name, None)
+
+        paginator = Paginator(object_list, per_page)
+        page = paginator.get_page(request.GET.get('page'))
+        self.number = page.number
+        self.count = paginator.count
+        self.num_pages = self.number_limit = paginator.num_pages
+        self.has_next = page.has_next()
+        self.has_previous = page.has_previous()
+        self.object_list = list(page.object_list)
+
+    @property
+    def next_query(self):
+        return self._query(page=self.number + 1) if self.has_next else None
+
+    @property
+    def previous_query(self):
+        return self._query(page=self.number - 1) if self.has_previous else None
+
+
+class KeysetPage(BasePage):
+    """
+    One page of a listing. The first `number_limit` pages use plain page
+    numbers (OFFSET); past them, pages are fetched by seeking from the
+    last row shown, so page 500 costs the same as page 6.
+    """
+
+    def __init__(self, request, queryset, per_page, sort='default', number_limit=5):
+        self.params = request.GET.copy()
+        for name in ('page', 'cursor'):
+            self.params.pop(name, None)
+
+        self.sort = sort if sort in SORTS else 'default'
+        self.field, self.descending, _ = SORTS[self.sort]
+        self.per_page = per_page
+        self.number_limit = number_limit
+        self.count = cached_count(queryset)
+        self.num_pages = max(1, -(-self.count // per_page))
+
+        cursor = decode_cursor(request.GET.get('cursor', ''))
+        value = cursor_value(self.field, cursor['value']) if cursor else None
+        if value is not None and cursor.get('sort') == self.sort and cursor['number'] > number_limit:
+            self.number = cursor['number']
+            rows = self._seek(queryset, value, cursor)
+        else:
+            try:
+                self.number = min(max(int(request.GET.get('page', 1)), 1), number_limit)
+            except ValueError:
+                self.number = 1
+            offset = (self.number - 1) * per_page
+            rows = list(self._ordered(queryset)[offset:offset + per_page + 1])
+            self.has_next = len(rows) > per_page
+            self.has_previous = self.number > 1
+            rows = rows[:per_page]
+
+        self.object_list = rows
+
+    def _ordered(self, queryset, reverse=False):
+        descending = self.descending != reverse
+        prefix = '-' if descending else ''
+        if self.field == 'id':
+            return queryset.order_by(f'{prefix}id')
+        return queryset.order_by(f'{prefix}{self.field}', f'{prefix}id')
+
+    def _seek(self, queryset, value, cursor):
+        """Rows strictly after (or, going back, before) the cursor's (value, id)."""
+        backwards = cursor.get('direction') == 'prev'
+        lookup = 'lt' if self.descending != backwards else 'gt'
+        after = Q(**{f'id__{lookup}': cursor['id']})
+        if self.field != 'id':
+            after = (Q(**{f'{self.field}__{lookup}': value})
+                     | Q(**{self.field: value}) & after)
+
+        rows = list(self._ordered(queryset.filter(after), reverse=backwards)[:self.per_page + 1])
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+            self.has_previous = more or self.number > 1
+            self.has_next = True
+        else:
+            self.has_previous = True
+            self.has_next = more
+        return rows
+
+    def _cursor_query(self, row, number, direction):
+        value = getattr(row, self.field)
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()  # keeps the microseconds the seek compares on
+        return self._query(cursor=encode_cursor({
+            'sort': self.sort,
+            'number': number,
+            'direction': direction,
+            'value': value,
+            'id': row.id,
+        }))
+
+    @property
+    def next_query(self):
+        if not self.has_next:
+            return None
+        if self.number < self.number_limit:
+            return self._query(page=self.number + 1)
+        return self._cursor_query(self.object_list[-1], self.number + 1, 'next')
+
+    @property
+    def previous_query(self):
+        if not self.has_previous:
+            return None
+        if self.number - 1 <= self.number_limit:
+            return self._query(page=self.number - 1)
+        return self._cursor_query(self.object_list[0], self.number - 1, 'prev')
+
+    @property
+    def sort_options(self):
+        """(name, label, query) for every listing order, starting from page 1."""
+        return [(name, label, self._query(sort=name)) for name, (_, _, label) in SORTS.items()]
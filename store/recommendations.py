@@ -1,51 +1,426 @@
+import hashlib
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from datetime import timedelta
+from itertools import groupby, islice, permutations
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections, transaction
+from django.db.models import Case, F, Max, When
+from django.utils import timezone
 from orders.models import OrderProduct
-from store.models import Product
-from mlxtend.frequent_patterns import apriori, association_rules
+from store.models import (Product, AssociationRule, ProductOrderCount,
+                          ProductCooccurrence, RecommendationStats,
+                          FrequentlyBoughtTogether)
+from store.mining import basket_from_order_products, mine_frequent_itemsets
+from store.artifacts import current_version, load_current_model
+from store.similarity import similar_product_ids
+from mlxtend.frequent_patterns import association_rules
 import pandas as pd
 
-def get_apriori_recommendations(cart_product_ids, min_support=0.01):
+logger = logging.getLogger(__name__)
+
+
+def mine_association_rules(min_support=0.01, min_lift=1.0, algorithm=None, window_days=None, workers=None):
+    """
+    Mine the order history and return the association rules
+    as a DataFrame (empty when nothing is frequent).
+
+    algorithm: 'apriori' or 'fpgrowth', defaults to
+    settings.RECOMMENDATION_MINING_ALGORITHM
+    window_days: only mine order lines from the last N days, defaults to
+    settings.RECOMMENDATION_WINDOW_DAYS (0 = whole history)
+    workers: processes counting itemsets in parallel, defaults to
+    settings.RECOMMENDATION_MINING_WORKERS
+    """
+    algorithm = algorithm or settings.RECOMMENDATION_MINING_ALGORITHM
+    workers = workers or settings.RECOMMENDATION_MINING_WORKERS
+    if window_days is None:
+        window_days = settings.RECOMMENDATION_WINDOW_DAYS
+
+    order_products = OrderProduct.objects.all()
+    if window_days:
+        order_products = order_products.filter(created_at__gte=timezone.now() - timedelta(days=window_days))
+
+    # 1. Sparse orders x products basket, straight from the order lines
+    basket, products = basket_from_order_products(order_products)
+
+    if basket.shape[0] == 0:
+        return pd.DataFrame()
+
+    # 2. Frequent itemsets
+    frequent_itemsets = mine_frequent_itemsets(basket, products, min_support=min_support,
+                                               algorithm=algorithm, workers=workers)
+
+    if frequent_itemsets.empty:
+        return pd.DataFrame()
+
+    # 3. Generate rules
+    return association_rules(frequent_itemsets, num_itemsets=basket.shape[0],
+                             metric="lift", min_threshold=min_lift)
+
+
+def rebuild_association_rules(min_support=0.01, min_lift=1.0, algorithm=None, top_k=4, window_days=None,
+                              workers=None):
     """
-    Get product recommendations based on Apriori algorithm
-    using previous order history.
-    
+    Mine the order history and replace the AssociationRule index.
+
+    Every rule is flattened into antecedent -> consequent product pairs,
+    keeping the strongest (highest lift) rule for each pair, so the cart
+    can be answered with a single lookup on its product ids.
+    Returns the number of rows written.
+    """
+    rules = mine_association_rules(min_support=min_support, min_lift=min_lift,
+                                   algorithm=algorithm, window_days=window_days, workers=workers)
+
+    pairs = {}
+    for rule in rules.itertuples(index=False):
+        for antecedent in rule.antecedents:
+            for consequent in rule.consequents:
+                key = (int(antecedent), int(consequent))
+                if key not in pairs or rule.lift > pairs[key].lift:
+                    pairs[key] = AssociationRule(
+                        antecedent_id=key[0],
+                        consequent_id=key[1],
+                        support=rule.support,
+                        confidence=rule.confidence,
+                        lift=rule.lift,
+                    )
+
+    with transaction.atomic():
+        AssociationRule.objects.all().delete()
+        AssociationRule.objects.bulk_create(pairs.values(), batch_size=1000)
+        # New version, so cached recommendations of the old rules are no longer used
+        RecommendationStats.objects.get_or_create(pk=1)
+        RecommendationStats.objects.filter(pk=1).update(rules_version=F('rules_version') + 1)
+        rebuild_frequently_bought_together(top_k=top_k)
+
+    return len(pairs)
+
+
+def rebuild_frequently_bought_together(top_k=4):
+    """
+    Replace every product's "frequently bought together" list with its
+    top_k strongest rules (by confidence, then lift).
+    Returns the number of rows written.
+    """
+    rules = (AssociationRule.objects
+             .order_by('antecedent_id', '-confidence', '-lift', 'consequent_id')
+             .values_list('antecedent_id', 'consequent_id', 'confidence', 'lift'))
+
+    rows = []
+    for product_id, product_rules in groupby(rules.iterator(), key=lambda rule: rule[0]):
+        for rank, (_, recommended_id, confidence, lift) in enumerate(islice(product_rules, top_k)):
+            rows.append(FrequentlyBoughtTogether(
+                product_id=product_id,
+                recommended_id=recommended_id,
+                rank=rank,
+                confidence=confidence,
+                lift=lift,
+            ))
+
+    with transaction.atomic():
+        FrequentlyBoughtTogether.objects.all().delete()
+        FrequentlyBoughtTogether.objects.bulk_create(rows, batch_size=1000)
+
+    return len(rows)
+
+
+def hydrate_products(product_ids):
+    """Products for the given ids, kept in the given order, in a single id__in query."""
+    if not product_ids:
+        return Product.objects.none()
+
+    ranking = Case(*[When(id=pid, then=rank) for rank, pid in enumerate(product_ids)])
+    return Product.objects.filter(id__in=product_ids).order_by(ranking)
+
+
+def apriori_recommended_ids(cart_product_ids):
+    """
+    Ids recommended by the precomputed association rules, strongest first.
+
     cart_product_ids: list of product IDs currently in cart
     """
+    cart_product_ids = list(cart_product_ids)
+    if not cart_product_ids:
+        return []  # no recommendations
+
+    # Consequents of every rule fired by the cart, leaving out
+    # products already in the cart
+    return list(AssociationRule.objects
+                .filter(antecedent_id__in=cart_product_ids)
+                .exclude(consequent_id__in=cart_product_ids)
+                .values('consequent_id')
+                .annotate(rule_lift=Max('lift'))
+                .order_by('-rule_lift', 'consequent_id')
+                .values_list('consequent_id', flat=True))
+
+
+def get_apriori_recommendations(cart_product_ids):
+    """
+    Get product recommendations from the precomputed association rules.
 
-    # 1. Fetch all completed orders
-    orders = OrderProduct.objects.values('order_id', 'product_id')
+    cart_product_ids: list of product IDs currently in cart
+    """
+    return hydrate_products(apriori_recommended_ids(cart_product_ids))
 
-    if not orders.exists():
-        return Product.objects.none()  # no recommendations
 
-    # 2. Convert orders to dataframe
-    df = pd.DataFrame(list(orders))
+def cooccurrence_recommended_ids(cart_product_ids, k=None):
+    """
+    Ids recommended by the published item-to-item co-occurrence model,
+    best first.
 
-    # 3. Create a basket for Apriori
-    basket = (df.groupby(['order_id', 'product_id'])
-                .size().unstack(fill_value=0))
+    cart_product_ids: list of product IDs currently in cart
+    """
+    recommender = load_current_model()
+    if recommender is None:
+        return []  # no model published yet
 
-    # Convert quantities to 1 (existence)
-    basket = basket.applymap(lambda x: 1 if x > 0 else 0)
+    return recommender.recommend(cart_product_ids, k=k or settings.RECOMMENDATION_COUNT)
 
-    # 4. Apply Apriori
-    frequent_itemsets = apriori(basket, min_support=min_support, use_colnames=True)
 
-    if frequent_itemsets.empty:
+def get_cooccurrence_recommendations(cart_product_ids, k=None):
+    """
+    Get product recommendations from the published item-to-item
+    co-occurrence model, ordered by score.
+
+    cart_product_ids: list of product IDs currently in cart
+    """
+    return hydrate_products(cooccurrence_recommended_ids(cart_product_ids, k=k))
+
+
+def counter_recommended_ids(cart_product_ids, k=None):
+    """
+    Ids recommended from the co-occurrence counters, strongest pair rule
+    (by lift, then orders together) first. The counters are updated by
+    every completed order, so this needs no mining and is never stale.
+
+    cart_product_ids: list of product IDs currently in cart
+    """
+    cart_product_ids = list(cart_product_ids)
+    pairs = list(ProductCooccurrence.objects
+                 .filter(product_id__in=cart_product_ids)
+                 .exclude(other_id__in=cart_product_ids)
+                 .values_list('product_id', 'other_id', 'count'))
+    if not pairs:
+        return []
+
+    involved = {a for a, _, _ in pairs} | {b for _, b, _ in pairs}
+    counts = dict(ProductOrderCount.objects.filter(product_id__in=involved).values_list('product_id', 'count'))
+    total = RecommendationStats.load().order_count
+
+    best = {}
+    for antecedent_id, consequent_id, together in pairs:
+        metrics = rule_metrics(together, counts.get(antecedent_id), counts.get(consequent_id), total)
+        if metrics:
+            best[consequent_id] = max(best.get(consequent_id, (0, 0)), (metrics['lift'], together))
+    ranked = sorted(best, key=lambda pid: (-best[pid][0], -best[pid][1], pid))
+    return ranked[:k or settings.RECOMMENDATION_COUNT]
+
+
+RECOMMENDATION_ENGINES = {
+    'rules': apriori_recommended_ids,
+    'cooccurrence': cooccurrence_recommended_ids,
+    'counters': counter_recommended_ids,
+}
+
+
+def recommendation_model_version(engine):
+    """Version of the model behind an engine; changes whenever the model is rebuilt."""
+    if engine == 'cooccurrence':
+        load_current_model()
+        return current_version()
+    if engine == 'counters':
+        return (RecommendationStats.objects
+                .filter(pk=1)
+                .values_list('order_count', flat=True)
+                .first() or 0)
+    return (RecommendationStats.objects
+            .filter(pk=1)
+            .values_list('rules_version', flat=True)
+            .first() or 0)
+
+
+def recommended_ids(cart_product_ids):
+    """
+    Ids recommended for the cart by the engine chosen with
+    settings.RECOMMENDATION_ENGINE.
+
+    Results are cached per (engine, model version, cart contents),
+    so shoppers with the same cart share one computation and a rebuilt
+    model is never served stale results.
+    """
+    cart_product_ids = sorted(set(cart_product_ids))
+    if not cart_product_ids:
+        return []
+
+    engine = settings.RECOMMENDATION_ENGINE
+    version = recommendation_model_version(engine)
+    cart_key = hashlib.md5(','.join(map(str, cart_product_ids)).encode()).hexdigest()
+    key = f'recommendations:{engine}:{version}:{cart_key}'
+
+    cache = caches['recommendations']
+    ids = cache.get(key)
+    if ids is None:
+        ids = RECOMMENDATION_ENGINES[engine](cart_product_ids)
+        if not ids:
+            # No order history to go on, fall back to content similarity
+            ids = similar_product_ids(cart_product_ids, k=settings.RECOMMENDATION_COUNT)
+        cache.set(key, ids)
+    return ids
+
+
+def get_recommendations(cart_product_ids):
+    """Recommend products for the cart, best first."""
+    return hydrate_products(recommended_ids(cart_product_ids))
+
+
+def popular_product_ids(exclude=(), k=None):
+    """Most ordered products, read from the co-occurrence counters."""
+    return list(ProductOrderCount.objects
+                .exclude(product_id__in=list(exclude))
+                .order_by('-count', 'product_id')
+                .values_list('product_id', flat=True)[:k or settings.RECOMMENDATION_COUNT])
+
+
+# Recommendations are computed off the request thread so the request can
+# stop waiting once its time budget is spent
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='recommendations')
+
+
+def _recommended_ids_in_thread(cart_product_ids):
+    try:
+        return recommended_ids(cart_product_ids)
+    finally:
+        connections.close_all()  # only closes this worker thread's connections
+
+
+def get_recommendations_within_budget(cart_product_ids, budget_ms=None):
+    """
+    Recommend products for the cart, giving up after budget_ms
+    (settings.RECOMMENDATION_TIME_BUDGET_MS by default) and falling back
+    to the most popular products.
+
+    A computation that runs over budget keeps going in the background and
+    lands in the cache, so the next request for the same cart is served.
+    """
+    cart_product_ids = list(cart_product_ids)
+    if not cart_product_ids:
         return Product.objects.none()
+    if budget_ms is None:
+        budget_ms = settings.RECOMMENDATION_TIME_BUDGET_MS
+
+    future = _executor.submit(_recommended_ids_in_thread, cart_product_ids)
+    try:
+        ids = future.result(timeout=budget_ms / 1000)
+    except FuturesTimeoutError:
+        logger.warning('Recommendations took longer than %sms, serving popular products', budget_ms)
+        ids = popular_product_ids(exclude=cart_product_ids)
+    except Exception:
+        logger.exception('Recommendations failed, serving popular products')
+        ids = popular_product_ids(exclude=cart_product_ids)
 
-    # 5. Generate rules
-    rules = association_rules(frequent_itemsets, metric="lift", min_threshold=1.0)
+    return hydrate_products(ids)
 
-    # 6. Get recommended products based on current cart
-    recommended_ids = set()
-    for _, rule in rules.iterrows():
-        if set(rule['antecedents']).intersection(cart_product_ids):
-            recommended_ids.update(rule['consequents'])
 
-    # Remove products already in cart
-    recommended_ids = recommended_ids.difference(cart_product_ids)
+def record_order_cooccurrence(product_ids):
+    """
+    Add one completed order to the co-occurrence counters.
 
-    return Product.objects.filter(id__in=recommended_ids)
+    product_ids: ids of the products in the order (duplicates are ignored)
+    Costs a handful of queries whatever the order size; the number of
+    rows touched is O(items^2).
+    """
+    product_ids = sorted(set(product_ids))
+    if not product_ids:
+        return
+
+    with transaction.atomic():
+        # Make sure every counter row exists, then bump them all at once
+        ProductOrderCount.objects.bulk_create(
+            [ProductOrderCount(product_id=pid) for pid in product_ids],
+            ignore_conflicts=True,
+        )
+        ProductOrderCount.objects.filter(product_id__in=product_ids).update(count=F('count') + 1)
+
+        if len(product_ids) > 1:
+            ProductCooccurrence.objects.bulk_create(
+                [ProductCooccurrence(product_id=a, other_id=b) for a, b in permutations(product_ids, 2)],
+                ignore_conflicts=True,
+            )
+            (ProductCooccurrence.objects
+                .filter(product_id__in=product_ids, other_id__in=product_ids)
+                .update(count=F('count') + 1))
+
+        RecommendationStats.objects.get_or_create(pk=1)
+        RecommendationStats.objects.filter(pk=1).update(order_count=F('order_count') + 1)
+
+
+def rebuild_cooccurrence():
+    """
+    Recount the co-occurrence counters from the whole order history.
+    Only needed once to backfill, or to repair drifted counters.
+    Returns the number of orders counted.
+    """
+    rows = (OrderProduct.objects
+            .order_by('order_id')
+            .values_list('order_id', 'product_id')
+            .distinct())
+
+    order_counts = Counter()
+    pair_counts = Counter()
+    orders = 0
+    for _, items in groupby(rows.iterator(), key=lambda row: row[0]):
+        product_ids = sorted({product_id for _, product_id in items})
+        orders += 1
+        order_counts.update(product_ids)
+        pair_counts.update(permutations(product_ids, 2))
+
+    with transaction.atomic():
+        ProductOrderCount.objects.all().delete()
+        ProductCooccurrence.objects.all().delete()
+        ProductOrderCount.objects.bulk_create(
+            [ProductOrderCount(product_id=pid, count=count) for pid, count in order_counts.items()],
+            batch_size=1000,
+        )
+        ProductCooccurrence.objects.bulk_create(
+            [ProductCooccurrence(product_id=a, other_id=b, count=count) for (a, b), count in pair_counts.items()],
+            batch_size=1000,
+        )
+        RecommendationStats.objects.update_or_create(pk=1, defaults={'order_count': orders})
+
+    return orders
+
+
+def rule_metrics(together, antecedent_count, consequent_count, total):
+    """
+    Support, confidence and lift of a pair rule from order counts, or
+    None when any count is missing or zero.
+    """
+    if not (together and antecedent_count and consequent_count and total):
+        return None
+    confidence = together / antecedent_count
+    return {'support': together / total, 'confidence': confidence, 'lift': confidence * total / consequent_count}
+
+
+def pair_rule_metrics(antecedent_id, consequent_id):
+    """
+    Support, confidence and lift of the rule antecedent -> consequent,
+    derived from the co-occurrence counters. None when the pair was
+    never bought together or a product's order count is missing.
+    """
+    together = (ProductCooccurrence.objects
+                .filter(product_id=antecedent_id, other_id=consequent_id)
+                .values_list('count', flat=True).first())
+    if not together:
+        return None
+
+    counts = dict(ProductOrderCount.objects
+                  .filter(product_id__in=[antecedent_id, consequent_id])
+                  .values_list('product_id', 'count'))
+    total = RecommendationStats.load().order_count
+    return rule_metrics(together, counts.get(antecedent_id), counts.get(consequent_id), total)
 
 
 # Another Way
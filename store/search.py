@@ -0,0 +1,237 @@
+import re
+
+from django.conf import settings
+from django.db import connection as default_connection, transaction
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from .models import Product
+
+# Words to search for: letters and digits only, so a term can be dropped
+# into a full-text query without escaping
+TERM_RE = re.compile(r'[^\W_]+')
+MAX_TERMS = 16
+
+
+def query_terms(keyword):
+    return TERM_RE.findall(keyword.lower())[:MAX_TERMS]
+
+
+class SearchBackend:
+    """
+    Product search over product_name and description. Subclasses keep
+    their index in step through index()/remove(), which the Product
+    signals call, and return ids best match first.
+    """
+
+    def __init__(self, connection=None):
+        self.connection = connection or default_connection
+
+    def install(self):
+        """Create the index (from a migration)."""
+
+    def uninstall(self):
+        """Drop the index (from a migration)."""
+
+    def index(self, product):
+        pass
+
+    def remove(self, product_id):
+        pass
+
+    def rebuild(self):
+        """Reindex every product. Returns the number of products."""
+        return Product.objects.count()
+
+    def search(self, keyword, offset, limit):
+        raise NotImplementedError
+
+    def count(self, keyword):
+        raise NotImplementedError
+
+
+class ScanSearchBackend(SearchBackend):
+    """No index: icontains over both columns, newest first."""
+
+    def _matches(self, keyword):
+        keyword = keyword.strip()
+        if not keyword:
+            return Product.objects.none()
+        return Product.objects.filter(Q(description__icontains=keyword) | Q(product_name__icontains=keyword))
+
+    def search(self, keyword, offset, limit):
+        return list(self._matches(keyword)
+                    .order_by('-created_date', '-id')
+                    .values_list('id', flat=True)[offset:offset + limit])
+
+    def count(self, keyword):
+        return self._matches(keyword).count()
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """
+    An FTS5 table keyed on the product id (its rowid), ranked by bm25
+    with the product name weighted above the description.
+    """
+
+    table = 'store_product_fts'
+
+    def _match(self, keyword):
+        # Every term must match, each as a prefix ("shir" finds "shirts")
+        return ' '.join(f'"{term}"*' for term in query_terms(keyword))
+
+    def install(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} "
+                f"USING fts5(product_name, description, tokenize='porter unicode61')"
+            )
+            cursor.execute(
+                f'INSERT INTO {self.table}(rowid, product_name, description) '
+                f'SELECT id, product_name, description FROM {Product._meta.db_table}'
+            )
+
+    def uninstall(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {self.table}')
+
+    def index(self, product):
+        with transaction.atomic(using=self.connection.alias), self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [product.pk])
+            cursor.execute(
+                f'INSERT INTO {self.table}(rowid, product_name, description) VALUES (%s, %s, %s)',
+                [product.pk, product.product_name, product.description],
+            )
+
+    def remove(self, product_id):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [product_id])
+
+    def rebuild(self):
+        with transaction.atomic(using=self.connection.alias), self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            cursor.execute(
+                f'INSERT INTO {self.table}(rowid, product_name, description) '
+                f'SELECT id, product_name, description FROM {Product._meta.db_table}'
+            )
+            cursor.execute(f"INSERT INTO {self.table}({self.table}) VALUES ('optimize')")
+            cursor.execute(f'SELECT count(*) FROM {self.table}')
+            return cursor.fetchone()[0]
+
+    def search(self, keyword, offset, limit):
+        match = self._match(keyword)
+        if not match:
+            return []
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s '
+                f'ORDER BY bm25({self.table}, 10.0, 1.0), rowid LIMIT %s OFFSET %s',
+                [match, limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def count(self, keyword):
+        match = self._match(keyword)
+        if not match:
+            return 0
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM {self.table} WHERE {self.table} MATCH %s', [match])
+            return cursor.fetchone()[0]
+
+
+class PostgresSearchBackend(SearchBackend):
+    """
+    A GIN index on the weighted tsvector of each product, ranked by
+    ts_rank. The index is on an expression over the row itself, so
+    Postgres keeps it current on every write.
+    """
+
+    index_name = 'store_product_search_idx'
+    vector = ("setweight(to_tsvector('english', coalesce(product_name, '')), 'A') || "
+              "setweight(to_tsvector('english', coalesce(description, '')), 'B')")
+
+    def _query(self, keyword):
+        return ' & '.join(f'{term}:*' for term in query_terms(keyword))
+
+    def install(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {self.index_name} '
+                f'ON {Product._meta.db_table} USING GIN (({self.vector}))'
+            )
+
+    def uninstall(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DROP INDEX IF EXISTS {self.index_name}')
+
+    def rebuild(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'REINDEX INDEX {self.index_name}')
+        return super().rebuild()
+
+    def search(self, keyword, offset, limit):
+        query = self._query(keyword)
+        if not query:
+            return []
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT id FROM {Product._meta.db_table} "
+                f"WHERE ({self.vector}) @@ to_tsquery('english', %s) "
+                f"ORDER BY ts_rank(({self.vector}), to_tsquery('english', %s)) DESC, id "
+                f"LIMIT %s OFFSET %s",
+                [query, query, limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def count(self, keyword):
+        query = self._query(keyword)
+        if not query:
+            return 0
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT count(*) FROM {Product._meta.db_table} "
+                f"WHERE ({self.vector}) @@ to_tsquery('english', %s)",
+                [query],
+            )
+            return cursor.fetchone()[0]
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_search_backend(connection=None):
+    """STORE_SEARCH_BACKEND when set, otherwise the backend for the database in use."""
+    connection = connection or default_connection
+    if settings.STORE_SEARCH_BACKEND:
+        return import_string(settings.STORE_SEARCH_BACKEND)(connection)
+    return BACKENDS.get(connection.vendor, ScanSearchBackend)(connection)
+
+
+class SearchResults:
+    """
+    Ranked matches for a keyword, for Paginator: only the count and the
+    page asked for are fetched.
+    """
+
+    def __init__(self, keyword, backend=None):
+        self.keyword = keyword
+        self.backend = backend or get_search_backend()
+
+    def count(self):
+        return self.backend.count(self.keyword)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop = index.start or 0, index.stop
+        if stop <= start:
+            return []
+        ids = self.backend.search(self.keyword, start, stop - start)
+        products = Product.objects.select_related('category').in_bulk(ids)
+        return [products[pid] for pid in ids if pid in products]
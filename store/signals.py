@@ -0,0 +1,131 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from category.models import Category
+
+from . import autocomplete
+from .caching import bump_page_version, touch_product
+from .facets import refresh_product_facets
+from .feed import invalidate_home_feed
+from .images import image_models, schedule_variants
+from .models import Product, ProductGallery, ReviewRating, Variation, is_stock_update
+from .search import get_search_backend
+
+
+# Models whose delete takes products with it: model -> Product field pointing at it
+PRODUCT_OWNERS = {Product: 'id', Category: 'category'}
+
+
+def _deleted_with_product(origin, product_id):
+    """
+    True when a delete cascades from deleting this row's own product (or
+    its category). Deletes started elsewhere, such as a reviewer's
+    account, leave the product behind and must still update it.
+    """
+    field = PRODUCT_OWNERS.get(getattr(origin, 'model', type(origin)))
+    if field is None:
+        return False
+    owners = {f'{field}__in': origin} if isinstance(origin, QuerySet) else {field: origin.pk}
+    return Product.objects.filter(pk=product_id, **owners).exists()
+
+
+def _stock_only(sender, kwargs):
+    """True for a product save that only moved its stock: listings, search and the home page do not show it."""
+    return sender is Product and is_stock_update(kwargs.get('update_fields'))
+
+
+# Keep Product.rating_avg / rating_count in step with its reviews
+@receiver(post_save, sender=ReviewRating)
+@receiver(post_delete, sender=ReviewRating)
+def update_product_rating(sender, instance, **kwargs):
+    if _deleted_with_product(kwargs.get('origin'), instance.product_id):
+        return  # the review is going away with its product
+    try:
+        product = Product.objects.get(pk=instance.product_id)
+    except Product.DoesNotExist:
+        return  # the review went away with its product
+    product.update_rating()
+
+
+# Keep the store's filter facets in step with products and their sizes
+@receiver(post_save, sender=Product)
+def update_product_facets(sender, instance, **kwargs):
+    if _stock_only(sender, kwargs):
+        return
+    refresh_product_facets(instance)
+
+
+@receiver(post_save, sender=Variation)
+@receiver(post_delete, sender=Variation)
+def update_variation_facets(sender, instance, **kwargs):
+    if _deleted_with_product(kwargs.get('origin'), instance.product_id):
+        return  # the variation is going away with its product
+    try:
+        product = Product.objects.get(pk=instance.product_id)
+    except Product.DoesNotExist:
+        return  # the variation went away with its product
+    refresh_product_facets(product)
+
+
+# Keep the search index in step with products
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, **kwargs):
+    if _stock_only(sender, kwargs):
+        return
+    get_search_backend().index(instance)
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    get_search_backend().remove(instance.pk)
+
+
+# Have this process's autocomplete index look for catalog changes on its next lookup
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_autocomplete(sender, **kwargs):
+    if _stock_only(sender, kwargs):
+        return
+    autocomplete.invalidate()
+
+
+# Retire cached pages and product fragments when what they show changes
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_pages(sender, **kwargs):
+    if _stock_only(sender, kwargs) and kwargs['instance'].stock > 0:
+        return  # the product page only shows stock once it runs out
+    bump_page_version()
+
+
+@receiver(post_save, sender=Variation)
+@receiver(post_delete, sender=Variation)
+@receiver(post_save, sender=ProductGallery)
+@receiver(post_delete, sender=ProductGallery)
+@receiver(post_save, sender=ReviewRating)
+@receiver(post_delete, sender=ReviewRating)
+def invalidate_product_fragments(sender, instance, **kwargs):
+    if _deleted_with_product(kwargs.get('origin'), instance.product_id):
+        return  # the product is going away, and retires the pages itself
+    touch_product(instance.product_id)
+
+
+# Recompute the home sections on their next view
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ReviewRating)
+@receiver(post_delete, sender=ReviewRating)
+def invalidate_feed(sender, **kwargs):
+    if _stock_only(sender, kwargs):
+        return
+    invalidate_home_feed()
+
+
+# Make thumbnails for new and replaced uploads
+for model, _ in image_models():
+    post_save.connect(schedule_variants, sender=model, dispatch_uid=f'image_variants_{model._meta.label_lower}')
@@ -0,0 +1,80 @@
+import numpy as np
+from django.db import transaction
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from store.models import Product, SimilarProduct
+
+
+def product_documents():
+    """(product ids, text) for every product: name, description and category name."""
+    rows = Product.objects.order_by('id').values_list(
+        'id', 'product_name', 'description', 'category__category_name')
+    ids, documents = [], []
+    for product_id, name, description, category in rows.iterator():
+        ids.append(product_id)
+        documents.append(f'{name} {name} {category} {description}')
+    return np.array(ids, dtype=np.int64), documents
+
+
+def nearest_neighbours(vectors, top_k, chunk_size=1000):
+    """
+    Yield (row, neighbour rows, scores) with the top_k most cosine-similar
+    rows for every row, best first. Rows are scored a chunk at a time so
+    memory stays at chunk_size x products.
+    """
+    for start in range(0, vectors.shape[0], chunk_size):
+        scores = (vectors[start:start + chunk_size] @ vectors.T).toarray()
+        for offset, row_scores in enumerate(scores):
+            row = start + offset
+            row_scores[row] = 0  # a product is not similar to itself
+            k = min(top_k, len(row_scores))
+            top = np.argpartition(-row_scores, k - 1)[:k]
+            top = top[row_scores[top] > 0]
+            top = top[np.argsort(-row_scores[top], kind='stable')]
+            yield row, top, row_scores[top]
+
+
+def rebuild_similar_products(top_k=6):
+    """
+    Vectorise every product with TF-IDF and replace the SimilarProduct
+    table with each product's top_k nearest neighbours.
+    Returns the number of rows written.
+    """
+    ids, documents = product_documents()
+
+    rows = []
+    if len(ids) > 1:
+        try:
+            vectors = TfidfVectorizer(stop_words='english', sublinear_tf=True).fit_transform(documents)
+        except ValueError:
+            vectors = None  # nothing but stop words to go on
+        if vectors is not None:
+            for row, neighbours, scores in nearest_neighbours(vectors, top_k):
+                rows.extend(
+                    SimilarProduct(product_id=ids[row], similar_id=ids[neighbour], rank=rank, score=score)
+                    for rank, (neighbour, score) in enumerate(zip(neighbours, scores))
+                )
+
+    with transaction.atomic():
+        SimilarProduct.objects.all().delete()
+        SimilarProduct.objects.bulk_create(rows, batch_size=1000)
+
+    return len(rows)
+
+
+def similar_product_ids(product_ids, k=6):
+    """Ids of the products most similar to any of product_ids, best first."""
+    product_ids = list(product_ids)
+    seen = set(product_ids)
+    similar_ids = []
+    for similar_id in (SimilarProduct.objects
+                       .filter(product_id__in=product_ids)
+                       .exclude(similar_id__in=product_ids)
+                       .order_by('-score', 'similar_id')
+                       .values_list('similar_id', flat=True)):
+        if similar_id not in seen:
+            seen.add(similar_id)
+            similar_ids.append(similar_id)
+            if len(similar_ids) == k:
+                break
+    return similar_ids
@@ -0,0 +1,38 @@
+from django import template
+
+register = template.Library()
+
+
+@register.filter
+def srcset(variants, image_format='jpeg'):
+    """'url 160w, url 320w, ...' for one format of an image's stored variants."""
+    return ', '.join(f'{url} {width}w' for width, url in (variants or {}).get(image_format, []))
+
+
+@register.filter
+def thumbnail(variants, width):
+    """URL of the narrowest JPEG variant at least `width` wide (else the widest), or ''."""
+    candidates = (variants or {}).get('jpeg', [])
+    if not candidates:
+        return ''
+    width = int(width)
+    for candidate_width, url in candidates:
+        if candidate_width >= width:
+            return url
+    return candidates[-1][1]
+
+
+@register.inclusion_tag('includes/picture.html')
+def picture(image, variants, sizes='100vw', css_class='', alt=''):
+    """
+    <picture> for an uploaded image: WebP and JPEG srcsets from its
+    variants, the original as the fallback src.
+    """
+    return {
+        'url': image.url if image else '',
+        'webp': srcset(variants, 'webp'),
+        'jpeg': srcset(variants, 'jpeg'),
+        'sizes': sizes,
+        'css_class': css_class,
+        'alt': alt,
+    }
@@ -1,3 +1,1154 @@
-from django.test import TestCase
+import importlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import unittest
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.db.models import F
+from django.http import QueryDict
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.backends.db import SessionStore
+
+from accounts.models import Account
+from category.models import Category
+from clothkart.storage import is_hashed
+from orders.models import Order, OrderProduct
+import numpy as np
+import pandas as pd
+from mlxtend.frequent_patterns import apriori
+from PIL import Image
+from scipy import sparse
+
+from .feed import home_feed, invalidate_home_feed, rebuild_home_feed
+from .images import make_variants, store_variants
+from .itemsets import sparse_apriori
+from .mining import build_basket, mine_frequent_itemsets
+from . import autocomplete
+from .artifacts import current_version, load_current_model, publish_model
+from .autocomplete import PrefixIndex
+from .caching import bump_page_version
+from .cooccurrence import CooccurrenceRecommender, windowed_recommender
+from .facets import PRICE_BUCKETS, facet_counts, filter_by_facet, price_bucket
+from .models import (AssociationRule, FrequentlyBoughtTogether, Product, ProductCooccurrence, ProductFacet,
+                     ProductGallery, ProductOrderCount, RecommendationStats, ReviewRating, Variation)
+from .pagination import KeysetPage, encode_cursor
+from .similarity import nearest_neighbours, rebuild_similar_products, similar_product_ids
+from .search import ScanSearchBackend, SearchResults, SQLiteSearchBackend, get_search_backend, query_terms
+from .templatetags.image_variants import srcset, thumbnail
+from .recommendations import (apriori_recommended_ids, counter_recommended_ids, get_recommendations_within_budget,
+                              pair_rule_metrics, rebuild_association_rules, rebuild_cooccurrence,
+                              rebuild_frequently_bought_together, record_order_cooccurrence, recommended_ids)
+from .views import load_product_detail
+
+
+def create_products(count, prefix='Item'):
+    """`count` available products in one new category, oldest first."""
+    category = Category.objects.create(category_name=f'{prefix} category', slug=f'{prefix.lower()}-category')
+    return [
+        Product.objects.create(product_name=f'{prefix} {i}', slug=f'{prefix.lower()}-{i}', price=100 + i,
+                               images='photoes/products/Blue-Shirt.jpg', stock=5, category=category)
+        for i in range(count)
+    ]
+
+
+class ProductDetailQueryTests(TestCase):
+    """The product page costs the same number of queries however much it shows."""
+
+    # product with its flags, colors, sizes, gallery, reviews with users,
+    # bought together, similar products
+    QUERY_BUDGET = 7
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(category_name='Shirts', slug='shirts')
+        cls.product = Product.objects.create(product_name='Blue Shirt', slug='blue-shirt', description='A blue shirt',
+                                             price=500, images='photoes/products/Blue-Shirt.jpg', stock=5,
+                                             category=cls.category)
+        cls.user = Account.objects.create_user('Test', 'User', 'tester', 'tester@example.com', 'password')
+
+    def add_details(self, count):
+        start = ProductGallery.objects.filter(product=self.product).count()
+        for i in range(start, start + count):
+            Variation.objects.create(product=self.product, variation_category='color', variation_value=f'color{i}')
+            Variation.objects.create(product=self.product, variation_category='size', variation_value=f'size{i}')
+            ProductGallery.objects.create(product=self.product, image=f'store/products/{i}.jpg')
+            user = Account.objects.create_user('Review', 'Er', f'reviewer{i}', f'reviewer{i}@example.com', 'password')
+            ReviewRating.objects.create(product=self.product, user=user, rating=4, subject=f'Review {i}')
+
+    def get_request(self, user=None):
+        request = RequestFactory().get(self.product.get_url())
+        request.session = SessionStore()
+        request.session.create()
+        request.user = user or AnonymousUser()
+        return request
+
+    def load(self, request):
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            product = load_product_detail(request, self.category.slug, self.product.slug)
+            # touch everything the template reads
+            for review in product.active_reviews:
+                review.user.full_name()
+            product.category.slug
+            list(product.bought_together.all())
+            list(product.similar_products.all())
+        return product
+
+    def test_query_budget_is_constant(self):
+        request = self.get_request()
+        self.add_details(1)
+        self.load(request)
+        self.add_details(3)
+        product = self.load(request)
+        self.assertEqual(len(product.active_colors), 4)
+        self.assertEqual(len(product.active_sizes), 4)
+        self.assertEqual(len(product.gallery), 4)
+        self.assertEqual(len(product.active_reviews), 4)
+
+    def test_flags_for_authenticated_user(self):
+        product = self.load(self.get_request(self.user))
+        self.assertFalse(product.in_cart)
+        self.assertFalse(product.purchased)
+
+    def test_inactive_details_are_left_out(self):
+        self.add_details(2)
+        Variation.objects.filter(variation_value='color0').update(is_active=False)
+        ReviewRating.objects.filter(subject='Review 1').update(status=False)
+        product = self.load(self.get_request())
+        self.assertEqual([v.variation_value for v in product.active_colors], ['color1'])
+        self.assertEqual([r.subject for r in product.active_reviews], ['Review 0'])
+
+
+class RatingTests(TestCase):
+    """Product.rating_avg/rating_count follow the active reviews."""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(category_name='Shirts', slug='shirts')
+        cls.product = Product.objects.create(product_name='Blue Shirt', slug='blue-shirt', price=500,
+                                             images='photoes/products/Blue-Shirt.jpg', stock=5, category=category)
+        cls.users = [Account.objects.create_user('Review', 'Er', f'rater{i}', f'rater{i}@example.com', 'password')
+                     for i in range(3)]
+
+    def rating(self):
+        product = Product.objects.get(pk=self.product.pk)
+        return product.rating_avg, product.rating_count
+
+    def test_reviews_created_edited_and_deleted(self):
+        self.assertEqual(self.rating(), (0, 0))
+        first = ReviewRating.objects.create(product=self.product, user=self.users[0], rating=5)
+        ReviewRating.objects.create(product=self.product, user=self.users[1], rating=3)
+        self.assertEqual(self.rating(), (4, 2))
+
+        first.rating = 2
+        first.save()
+        self.assertEqual(self.rating(), (2.5, 2))
+
+        first.status = False
+        first.save()
+        self.assertEqual(self.rating(), (3, 1))
+
+        ReviewRating.objects.filter(user=self.users[1]).get().delete()
+        self.assertEqual(self.rating(), (0, 0))
+
+    def test_deleting_a_reviewer_recomputes_the_rating(self):
+        ReviewRating.objects.create(product=self.product, user=self.users[0], rating=4)
+        ReviewRating.objects.create(product=self.product, user=self.users[1], rating=2)
+        modified = Product.objects.get(pk=self.product.pk).modified_date
+        self.assertEqual(self.rating(), (3, 2))
+
+        self.users[0].delete()
+        self.assertEqual(self.rating(), (2, 1))
+        self.assertGreater(Product.objects.get(pk=self.product.pk).modified_date, modified)  # fragments retired
+
+        Account.objects.filter(pk=self.users[1].pk).delete()
+        self.assertEqual(self.rating(), (0, 0))
+
+    def test_product_and_category_deletes_take_reviews_along(self):
+        ReviewRating.objects.create(product=self.product, user=self.users[0], rating=4)
+        Variation.objects.create(product=self.product, variation_category='size', variation_value='medium')
+        self.product.category.delete()
+        self.assertFalse(Product.objects.exists())
+        self.assertFalse(ReviewRating.objects.exists())
+        self.assertFalse(ProductFacet.objects.exists())
+
+    def test_migration_and_command_backfill_existing_reviews(self):
+        fill_ratings = importlib.import_module('store.migrations.0016_product_rating_aggregates').fill_ratings
+        ReviewRating.objects.create(product=self.product, user=self.users[0], rating=4)
+        ReviewRating.objects.create(product=self.product, user=self.users[1], rating=1, status=False)
+        ReviewRating.objects.create(product=self.product, user=self.users[2], rating=5)
+        Product.objects.update(rating_avg=0, rating_count=0)
+        fill_ratings(django_apps, None)
+        self.assertEqual(self.rating(), (4.5, 2))
+
+        Product.objects.update(rating_avg=0, rating_count=0)
+        call_command('backfill_ratings', stdout=StringIO())
+        self.assertEqual(self.rating(), (4.5, 2))
+
+
+class FacetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.shirts = Category.objects.create(category_name='Shirts', slug='shirts')
+        cls.jeans = Category.objects.create(category_name='Jeans', slug='jeans')
+        cls.products = []
+        for i, (category, price, sizes) in enumerate(((cls.shirts, 450, ['small', 'medium']),
+                                                      (cls.shirts, 999, ['medium']),
+                                                      (cls.jeans, 1500, ['medium', 'large']),
+                                                      (cls.jeans, 7000, []))):
+            product = Product.objects.create(product_name=f'Item {i}', slug=f'item-{i}', price=price,
+                                             images='photoes/products/Blue-Shirt.jpg', stock=5, category=category)
+            for size in sizes:
+                Variation.objects.create(product=product, variation_category='size', variation_value=size)
+            cls.products.append(product)
+
+    def facets(self, product):
+        return sorted(ProductFacet.objects.filter(product=product).values_list('facet', 'value'))
+
+    def test_price_buckets(self):
+        for price, bucket in ((0, 0), (499, 0), (500, 1), (999, 1), (1000, 2), (4999, 3), (5000, 4), (99999, 4)):
+            self.assertEqual(price_bucket(price), PRICE_BUCKETS[bucket][0], price)
+
+    def test_rows_follow_products_and_sizes(self):
+        product = self.products[0]
+        self.assertEqual(self.facets(product), [('category', str(self.shirts.id)), ('price', 'Under Rs. 500'),
+                                                ('size', 'medium'), ('size', 'small')])
+        product.price = 2500
+        product.category = self.jeans
+        product.save()
+        Variation.objects.get(product=product, variation_value='small').delete()
+        Variation.objects.filter(product=product, variation_value='medium').update(is_active=False)
+        Variation.objects.create(product=product, variation_category='size', variation_value='xl')
+        self.assertEqual(self.facets(product), [('category', str(self.jeans.id)), ('price', 'Rs. 2000 - 4999'),
+                                                ('size', 'xl')])
+
+    def test_counts_leave_out_the_facets_own_filter(self):
+        products = Product.objects.all()
+        medium = filter_by_facet(products, 'size', ['medium'])
+        shirts = filter_by_facet(products, 'category', [str(self.shirts.id)])
+        counts = facet_counts({'category': medium, 'size': shirts})
+        self.assertEqual(counts['category'], {str(self.shirts.id): 2, str(self.jeans.id): 1})
+        self.assertEqual(counts['size'], {'small': 1, 'medium': 2})
+        self.assertEqual(list(filter_by_facet(medium, 'category', [str(self.jeans.id)])), [self.products[2]])
+
+    def test_product_delete_removes_its_rows(self):
+        self.products[2].delete()
+        self.assertFalse(ProductFacet.objects.filter(product_id=self.products[2].id).exists())
+
+
+class SearchTests(TestCase):
+
+    # keywords carrying FTS5 / tsquery syntax; they must be searched as plain words
+    HOSTILE_KEYWORDS = ('"', '*', 'shirt"*', '"blue" OR *', 'NEAR(blue shirt)', 'blue -shirt', "blue' & !shirt",
+                        'blue:* | x', '(((', '^blue', 'product_name:blue')
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(category_name='Shirts', slug='shirts')
+        cls.products = [
+            Product.objects.create(product_name=name, slug=f'product-{i}', description=description, price=500,
+                                   images='photoes/products/Blue-Shirt.jpg', stock=5, category=category)
+            for i, (name, description) in enumerate((
+                ('Blue Shirt', 'Cotton, for summer'),
+                ('Red Dress', 'Goes well with a blue shirt'),
+                ('Denim Jacket', 'Heavy cotton denim'),
+            ))
+        ]
+
+    def names(self, backend, keyword):
+        return [product.product_name for product in SearchResults(keyword, backend)[0:10]]
+
+    def test_query_terms_keep_words_only(self):
+        self.assertEqual(query_terms('"Blue" OR shirt* (NEAR)'), ['blue', 'or', 'shirt', 'near'])
+        self.assertEqual(query_terms('"*()^:'), [])
+
+    @unittest.skipUnless(connection.vendor == 'sqlite', 'FTS5 is SQLite only')
+    def test_fts5_ranks_name_matches_first(self):
+        backend = SQLiteSearchBackend()
+        self.assertEqual(self.names(backend, 'blue shirt'), ['Blue Shirt', 'Red Dress'])
+        self.assertEqual(self.names(backend, 'shirts'), ['Blue Shirt', 'Red Dress'])  # stemmed
+        self.assertEqual(self.names(backend, 'den'), ['Denim Jacket'])  # prefix
+        self.assertEqual(backend.count('cotton'), 2)
+
+    @unittest.skipUnless(connection.vendor == 'sqlite', 'FTS5 is SQLite only')
+    def test_fts5_follows_product_changes(self):
+        backend = SQLiteSearchBackend()
+        jacket = self.products[2]
+        jacket.product_name = 'Quilted Jacket'
+        jacket.save()
+        self.assertEqual(self.names(backend, 'quilted'), ['Quilted Jacket'])
+        jacket.delete()
+        self.assertEqual(self.names(backend, 'jacket'), [])
+        self.assertEqual(backend.rebuild(), 2)
+
+    def test_syntax_in_keywords_is_not_interpreted(self):
+        for backend in (get_search_backend(), ScanSearchBackend()):
+            for keyword in self.HOSTILE_KEYWORDS:
+                results = SearchResults(keyword, backend)
+                self.assertEqual(len(results[0:10]), min(results.count(), 10), keyword)
+        self.assertEqual(self.names(get_search_backend(), '"blue" OR *'), [])  # every word must match
+        self.assertEqual(self.names(get_search_backend(), 'shirt"*'), ['Blue Shirt', 'Red Dress'])
+        self.assertEqual(SearchResults('"*()', get_search_backend()).count(), 0)
+
+    def test_scan_fallback(self):
+        backend = ScanSearchBackend()
+        self.assertEqual(self.names(backend, 'blue shirt'), ['Red Dress', 'Blue Shirt'])  # newest first
+        self.assertEqual(backend.count('  '), 0)
+
+        other = type('Connection', (), {'vendor': 'oracle'})()
+        self.assertIsInstance(get_search_backend(other), ScanSearchBackend)
+        with self.settings(STORE_SEARCH_BACKEND='store.search.ScanSearchBackend'):
+            self.assertIsInstance(get_search_backend(), ScanSearchBackend)
+            response = self.client.get('/store/search/', {'keyword': 'denim'})
+        self.assertContains(response, 'Denim Jacket')
+
+
+class KeysetPageTests(TestCase):
+    """Past the numbered pages, cursors seek; a cursor that does not fit the sort falls back to page 1."""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(category_name='Shirts', slug='shirts')
+        cls.products = [
+            Product.objects.create(product_name=f'Shirt {i}', slug=f'shirt-{i}', price=100 * (i % 4) + i,
+                                   images='photoes/products/Blue-Shirt.jpg', stock=5, category=category)
+            for i in range(9)
+        ]
+
+    def page(self, sort, **params):
+        request = RequestFactory().get('/store/', params)
+        return KeysetPage(request, Product.objects.all(), 2, sort=sort, number_limit=1)
+
+    def ids(self, page):
+        return [product.id for product in page]
+
+    def test_cursors_walk_every_sort(self):
+        for sort in ('default', 'newest', 'price_low', 'price_high'):
+            page = self.page(sort)
+            seen = self.ids(page)
+            while page.next_query:
+                page = self.page(sort, cursor=QueryDict(page.next_query)['cursor'])
+                seen += self.ids(page)
+            self.assertEqual(len(seen), 9, sort)
+            self.assertEqual(len(set(seen)), 9, sort)
+
+            previous = self.page(sort, cursor=QueryDict(page.previous_query)['cursor'])
+            self.assertEqual(self.ids(previous), seen[-3:-1], sort)
+
+    def test_tampered_cursors_fall_back_to_page_one(self):
+        first = {sort: self.ids(self.page(sort)) for sort in ('newest', 'price_low')}
+        created = self.products[4].created_date.isoformat()
+        for sort, value, id in (('price_low', 300, 'x'),
+                                ('price_low', 300, 2 ** 70),
+                                ('price_low', 300, True),
+                                ('price_low', 'cheap', 4),
+                                ('price_low', [300], 4),
+                                ('price_low', created, 4),
+                                ('newest', 300, 4),
+                                ('newest', '2026-13-01T00:00:00+00:00', 4),
+                                ('newest', 'yesterday', 4)):
+            cursor = encode_cursor({'sort': sort, 'number': 3, 'direction': 'next', 'value': value, 'id': id})
+            page = self.page(sort, cursor=cursor)
+            self.assertEqual(page.number, 1, (sort, value, id))
+            self.assertEqual(self.ids(page), first[sort])
+
+
+# A plan step walking a whole table, or a whole index of it, rather than
+# seeking: "SCAN <table>" or "SCAN <table> USING [COVERING] INDEX <index>"
+FULL_SCAN_RE = re.compile(r'^SCAN (\w+)(?: USING (?:COVERING )?INDEX (\w+))?$')
+
+# Tables a page reads in full on purpose: the category menu lists them all
+ALLOWED_SCANS = {'category_category'}
+
+# Indexes a page may walk from end to end, and why
+ALLOWED_INDEX_SCANS = {
+    # partial index of available products by id: the default listing
+    # stops at its LIMIT, the listing count reads nothing else
+    'store_product_available_idx',
+    # (is_available, category, price), read without the table: facet
+    # counts for the unfiltered listing need every available product id
+    'store_produ_is_avai_71b826_idx',
+}
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN output is SQLite specific')
+class QueryPlanTests(TestCase):
+    """
+    Every query the hot pages run must be answered by seeking an index.
+    Walking one is only accepted for the indexes in ALLOWED_INDEX_SCANS.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Account.objects.create_user('Plan', 'User', 'planner', 'planner@example.com', 'password')
+        cls.user.is_active = True
+        cls.user.save()
+        cls.categories = [Category.objects.create(category_name=f'Category {i}', slug=f'category-{i}') for i in range(3)]
+        cls.products = []
+        for i in range(12):
+            product = Product.objects.create(product_name=f'Shirt {i}', slug=f'shirt-{i}', description=f'Cotton shirt {i}',
+                                             price=300 + i * 150, images='photoes/products/Blue-Shirt.jpg', stock=10,
+                                             category=cls.categories[i % 3])
+            Variation.objects.create(product=product, variation_category='color', variation_value='red')
+            Variation.objects.create(product=product, variation_category='size', variation_value='medium')
+            cls.products.append(product)
+        cls.order = Order.objects.create(user=cls.user, order_number='2026101801', first_name='Plan', last_name='User',
+                                         phone='1', email='planner@example.com', address_line_1='x', country='x',
+                                         state='x', city='x', order_total=300, tax=0, is_ordered=True)
+        OrderProduct.objects.create(order=cls.order, user=cls.user, product=cls.products[0], quantity=1,
+                                    product_price=300, ordered=True)
+
+    def full_scans(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            plan = [row[-1] for row in cursor.fetchall()]
+        scans = [FULL_SCAN_RE.match(step) for step in plan]
+        return [scan.group(0) for scan in scans
+                if scan and scan.group(1) not in ALLOWED_SCANS and scan.group(2) not in ALLOWED_INDEX_SCANS]
+
+    def assertIndexed(self, method, url, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = method(url, data or {})
+        self.assertIn(response.status_code, (200, 302))
+        for query in queries.captured_queries:
+            sql = query['sql']
+            if sql.split(' ', 1)[0] in ('SELECT', 'UPDATE', 'DELETE'):
+                self.assertEqual(self.full_scans(sql), [], f'{url} scans a table for: {sql}')
+
+    def test_ordered_walks_are_caught(self):
+        # in ORDER BY order and stopping at LIMIT, but still reading every row to find them
+        self.assertEqual(self.full_scans('SELECT id FROM store_product ORDER BY id LIMIT 5'), ['SCAN store_product'])
+        self.assertEqual(self.full_scans('SELECT id FROM store_product WHERE is_available ORDER BY id LIMIT 5'), [])
+
+    def test_store_listing(self):
+        self.assertIndexed(self.client.get, '/store/')
+        self.assertIndexed(self.client.get, self.categories[1].get_url())
+        self.assertIndexed(self.client.get, '/store/', {'category': self.categories[0].id, 'size': 'medium',
+                                                        'min_price': 0, 'max_price': 999})
+        for sort in ('newest', 'price_low', 'price_high', 'rating'):
+            self.assertIndexed(self.client.get, self.categories[1].get_url(), {'sort': sort})
+
+    def test_product_detail(self):
+        self.assertIndexed(self.client.get, self.products[4].get_url())
+
+    def test_search(self):
+        self.assertIndexed(self.client.get, '/store/search/', {'keyword': 'cotton'})
+
+    def test_cart(self):
+        url = f'/cart/add_cart/{self.products[2].id}/'
+        self.assertIndexed(self.client.post, url, {'color': 'red', 'size': 'medium'})
+        self.assertIndexed(self.client.get, '/cart/')
+
+        self.client.force_login(self.user)
+        self.assertIndexed(self.client.post, url, {'color': 'red', 'size': 'medium'})
+        self.assertIndexed(self.client.get, '/cart/')
+
+    def test_home(self):
+        rebuild_home_feed()
+        self.assertIndexed(self.client.get, '/')
+
+    def test_orders(self):
+        self.client.force_login(self.user)
+        self.assertIndexed(self.client.get, '/accounts/my_orders/')
+        self.assertIndexed(self.client.get, f'/accounts/order_detail/{self.order.order_number}/')
+
+
+@override_settings(HOME_FEED_SIZE=3)
+class HomeFeedTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(category_name='Shirts', slug='shirts')
+        cls.products = [
+            Product.objects.create(product_name=f'Shirt {i}', slug=f'shirt-{i}', price=100 * (i + 1),
+                                   images='photoes/products/Blue-Shirt.jpg', stock=5, category=cls.category)
+            for i in range(5)
+        ]
+        ProductOrderCount.objects.create(product=cls.products[1], count=4)
+        ProductOrderCount.objects.create(product=cls.products[3], count=9)
+        Product.objects.filter(pk=cls.products[2].pk).update(rating_avg=4.5, rating_count=2)
+
+    def setUp(self):
+        invalidate_home_feed()
+
+    def test_sections_are_bounded_and_ranked(self):
+        sections = {key: [p.id for p in products] for key, _, products in home_feed()}
+        self.assertEqual(sections['newest'], [p.id for p in self.products[:1:-1]])
+        self.assertEqual(sections['best_selling'], [self.products[3].id, self.products[1].id])
+        self.assertEqual(sections['top_rated'], [self.products[2].id])
+
+    def test_cached_feed_hydrates_in_one_query(self):
+        rebuild_home_feed()
+        with self.assertNumQueries(1):
+            for _, _, products in home_feed():
+                for product in products:
+                    product.get_url()
+
+    def test_product_changes_refresh_the_feed(self):
+        home_feed()
+        product = self.products[4]
+        product.is_available = False
+        product.save()
+        newest = home_feed()[0][2]
+        self.assertNotIn(product, newest)
+        self.assertEqual(len(newest), 3)
+
+
+@override_settings(STORE_PAGE_CACHE_TIMEOUT=60)
+class PageCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(category_name='Shirts', slug='shirts')
+        cls.product = Product.objects.create(product_name='Blue Shirt', slug='blue-shirt', price=500,
+                                             images='photoes/products/Blue-Shirt.jpg', stock=5, category=category)
+
+    def setUp(self):
+        bump_page_version()
+        invalidate_home_feed()
+
+    def cache_status(self):
+        return self.client.get(self.product.get_url())['X-Page-Cache']
+
+    def test_cached_page_is_dropped_after_an_edit(self):
+        self.assertEqual(self.cache_status(), 'miss')
+        self.assertEqual(self.cache_status(), 'hit')
+
+        self.product.product_name = 'Navy Shirt'
+        self.product.save()
+        response = self.client.get(self.product.get_url())
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Navy Shirt')
+        self.assertEqual(self.cache_status(), 'hit')
+
+    def test_stock_updates_keep_caches_until_sold_out(self):
+        self.cache_status()
+        rebuild_home_feed()
+        self.product.stock = 2
+        self.product.save(update_fields=['stock'])
+        self.assertEqual(self.cache_status(), 'hit')
+        with self.assertNumQueries(1):  # products only: the section ids are still cached
+            home_feed()
+
+        self.product.stock = 0
+        self.product.save(update_fields=['stock'])
+        response = self.client.get(self.product.get_url())
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Out of Stock')
+
+
+class ProductUrlTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(category_name='Shirts', slug='shirts')
+        cls.product = Product.objects.create(product_name='Blue Shirt', slug='blue-shirt', price=500,
+                                             images='photoes/products/Blue-Shirt.jpg', stock=5, category=cls.category)
+
+    def test_url_is_stored_on_save(self):
+        self.assertEqual(self.product.url_path, '/store/category/shirts/blue-shirt/')
+        self.product.slug = 'navy-shirt'
+        self.product.save(update_fields=['slug'])
+        self.assertEqual(Product.objects.get(pk=self.product.pk).url_path, '/store/category/shirts/navy-shirt/')
+
+    def test_get_url_needs_no_queries(self):
+        products = list(Product.objects.all())
+        with self.assertNumQueries(0):
+            self.assertEqual([p.get_url() for p in products], ['/store/category/shirts/blue-shirt/'])
+
+    def test_category_slug_change_moves_product_urls(self):
+        self.category.slug = 'tops'
+        self.category.save()
+        self.assertEqual(Product.objects.get(pk=self.product.pk).get_url(), '/store/category/tops/blue-shirt/')
+
+
+class ImageVariantTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        overrides = override_settings(MEDIA_ROOT=media, IMAGE_VARIANT_WIDTHS=(160, 320, 640))
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        (Path(media) / 'products').mkdir()
+        Image.new('RGBA', (400, 300), (200, 30, 30, 255)).save(Path(media) / 'products' / 'shirt.png')
+
+    def test_variants_are_never_wider_than_the_original(self):
+        variants = make_variants('products/shirt.png')
+        self.assertEqual(variants['source'], 'products/shirt.png')
+        self.assertEqual([width for width, _ in variants['webp']], [160, 320, 400])
+        self.assertRegex(variants['jpeg'][0][1], r'^/media/derived/products/shirt-160w\.[0-9a-f]{12}\.jpg$')
+        self.assertRegex(srcset(variants, 'jpeg').split(', ')[1], r'^/media/derived/products/shirt-320w\.\w+\.jpg 320w$')
+        self.assertRegex(thumbnail(variants, 200), r'^/media/derived/products/shirt-320w\.\w+\.jpg$')
+
+    def test_replaced_image_deletes_the_old_derivatives(self):
+        Image.new('RGB', (300, 300), (30, 30, 200)).save(Path(settings.MEDIA_ROOT) / 'products' / 'jeans.png')
+        shirt, jeans = create_products(2)
+        Product.objects.filter(pk=shirt.pk).update(images='products/shirt.png')
+        store_variants(Product, shirt.pk, 'images')
+        old_files = Product.objects.get(pk=shirt.pk).images_variants['files']
+        self.assertEqual(len(old_files), 6)
+        self.assertTrue(all(default_storage.exists(name) for name in old_files))
+
+        Product.objects.filter(pk=shirt.pk).update(images='products/jeans.png')
+        store_variants(Product, shirt.pk, 'images')
+        new_files = Product.objects.get(pk=shirt.pk).images_variants['files']
+        self.assertFalse(any(default_storage.exists(name) for name in old_files))
+        self.assertTrue(all(default_storage.exists(name) for name in new_files))
+
+        # The same upload on another product shares the derivatives, which are kept
+        Product.objects.filter(pk=jeans.pk).update(images='products/jeans.png')
+        store_variants(Product, jeans.pk, 'images')
+        Product.objects.filter(pk=shirt.pk).update(images='products/shirt.png')
+        store_variants(Product, shirt.pk, 'images')
+        self.assertTrue(all(default_storage.exists(name) for name in new_files))
+
+    def test_missing_file_records_the_source_only(self):
+        variants = make_variants('products/missing.png')
+        self.assertEqual(variants, {'source': 'products/missing.png'})
+        self.assertEqual(srcset(variants, 'webp'), '')
+        self.assertEqual(thumbnail(variants, 200), '')
+
+
+class MediaServingTests(TestCase):
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        overrides = override_settings(MEDIA_ROOT=media, MEDIA_SENDFILE='')
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.name = default_storage.save('products/shirt.jpg', ContentFile(b'0123456789'))
+        self.url = default_storage.url(self.name)
+
+    def test_uploads_get_content_hashed_names(self):
+        self.assertRegex(self.name, r'^products/shirt\.[0-9a-f]{12}\.jpg$')
+        self.assertEqual(default_storage.save('products/shirt.jpg', ContentFile(b'0123456789')), self.name)
+        self.assertNotEqual(default_storage.save('products/shirt.jpg', ContentFile(b'other')), self.name)
+
+    def test_hashed_files_are_immutable_and_revalidate(self):
+        response = self.client.get(self.url)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        not_modified = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], response['ETag'])
+
+    def test_byte_ranges(self):
+        for header, body, content_range in (('bytes=2-5', b'2345', 'bytes 2-5/10'),
+                                            ('bytes=7-', b'789', 'bytes 7-9/10'),
+                                            ('bytes=-3', b'789', 'bytes 7-9/10'),
+                                            ('bytes=8-99', b'89', 'bytes 8-9/10')):
+            response = self.client.get(self.url, HTTP_RANGE=header)
+            self.assertEqual(response.status_code, 206)
+            self.assertEqual(b''.join(response.streaming_content), body)
+            self.assertEqual(response['Content-Range'], content_range)
+            self.assertEqual(response['Content-Length'], str(len(body)))
+
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=10-').status_code, 416)
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=0-1,4-5').status_code, 200)
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=2-5', HTTP_IF_RANGE='"stale"').status_code, 200)
+
+    def test_proxy_handoff_and_missing_files(self):
+        with self.settings(MEDIA_SENDFILE='x-accel-redirect', MEDIA_ACCEL_PREFIX='/protected-media/'):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + self.name)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(self.client.get('/media/products/missing.jpg').status_code, 404)
+        self.assertEqual(self.client.get('/media/../manage.py').status_code, 404)
+
+
+def place_orders(baskets, created_at=None):
+    """One completed order per basket of product ids, placed by a new customer."""
+    number = Order.objects.count()
+    user = Account.objects.create_user('Order', 'User', f'customer{number}', f'customer{number}@example.com',
+                                       'password')
+    for i, items in enumerate(baskets, start=number):
+        order = Order.objects.create(user=user, order_number=f'T{i}', first_name='O', last_name='U', phone='1',
+                                     email=user.email, address_line_1='x', country='x', state='x', city='x',
+                                     order_total=1, tax=0, is_ordered=True)
+        lines = OrderProduct.objects.bulk_create(
+            OrderProduct(order=order, user=user, product_id=product_id, quantity=1, product_price=1, ordered=True)
+            for product_id in items
+        )
+        if created_at:
+            OrderProduct.objects.filter(pk__in=[line.pk for line in lines]).update(created_at=created_at)
+
+
+class AssociationRuleTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.a, cls.b, cls.c, cls.d = (product.id for product in create_products(4))
+
+    def add_rule(self, antecedent, consequent, lift, confidence=0.5):
+        AssociationRule.objects.create(antecedent_id=antecedent, consequent_id=consequent, support=0.1,
+                                       confidence=confidence, lift=lift)
+
+    def test_cart_lookup_ranks_by_strongest_rule(self):
+        self.add_rule(self.a, self.c, 2.0)
+        self.add_rule(self.b, self.c, 3.0)
+        self.add_rule(self.a, self.d, 2.5)
+        self.add_rule(self.a, self.b, 9.0)
+        self.add_rule(self.d, self.b, 9.0)  # not fired by the cart
+
+        with self.assertNumQueries(1):
+            self.assertEqual(apriori_recommended_ids([self.a, self.b]), [self.c, self.d])
+        self.assertEqual(apriori_recommended_ids([self.a]), [self.b, self.d, self.c])
+        self.assertEqual(apriori_recommended_ids([]), [])
+
+    def test_rebuild_flattens_mined_rules_into_pairs(self):
+        place_orders([[self.a, self.b]] * 3 + [[self.a, self.b, self.c]] + [[self.c]] * 2)
+        self.add_rule(self.d, self.a, 1.0)  # left over from an earlier rebuild
+
+        written = rebuild_association_rules(min_support=0.3, min_lift=1.0)
+        rules = {(rule.antecedent_id, rule.consequent_id): rule for rule in AssociationRule.objects.all()}
+        self.assertEqual(written, len(rules))
+        self.assertEqual(set(rules), {(self.a, self.b), (self.b, self.a)})
+        self.assertAlmostEqual(rules[self.a, self.b].support, 4 / 6)
+        self.assertAlmostEqual(rules[self.a, self.b].lift, 1.5)
+        self.assertEqual(apriori_recommended_ids([self.b]), [self.a])
+
+
+class CooccurrenceCounterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.a, cls.b, cls.c = (product.id for product in create_products(3))
+
+    def setUp(self):
+        for order in ([self.a, self.b], [self.a, self.b, self.c, self.c], [self.a, self.c]):
+            record_order_cooccurrence(order)
+
+    def test_counters_and_pair_metrics(self):
+        self.assertEqual(dict(ProductOrderCount.objects.values_list('product_id', 'count')),
+                         {self.a: 3, self.b: 2, self.c: 2})
+        self.assertEqual(pair_rule_metrics(self.a, self.b), {'support': 2 / 3, 'confidence': 2 / 3, 'lift': 1.0})
+        self.assertAlmostEqual(pair_rule_metrics(self.b, self.c)['lift'], 0.75)
+
+        ProductOrderCount.objects.filter(product_id=self.c).delete()
+        self.assertIsNone(pair_rule_metrics(self.b, self.c))  # no KeyError on a missing counter
+        self.assertIsNone(pair_rule_metrics(self.b, 999))
+
+    def test_rebuild_matches_incremental_counts(self):
+        place_orders([[self.a, self.b], [self.a, self.b, self.c], [self.a, self.c]])
+        before = sorted(ProductCooccurrence.objects.values_list('product_id', 'other_id', 'count'))
+        self.assertEqual(rebuild_cooccurrence(), 3)
+        self.assertEqual(sorted(ProductCooccurrence.objects.values_list('product_id', 'other_id', 'count')), before)
+
+    @override_settings(RECOMMENDATION_ENGINE='counters')
+    def test_counters_engine_follows_new_orders(self):
+        self.assertEqual(counter_recommended_ids([self.b]), [self.a, self.c])
+        self.assertEqual(recommended_ids([self.b]), [self.a, self.c])
+        record_order_cooccurrence([self.b, self.c])
+        record_order_cooccurrence([self.b, self.c])
+        self.assertEqual(recommended_ids([self.b]), [self.c, self.a])  # the cached answer is not reused
+        self.assertEqual(counter_recommended_ids([self.a, self.b, self.c]), [])
+
+
+def random_basket(orders=400, products=30, seed=7):
+    """A reproducible sparse basket where a few products are often bought together."""
+    rng = np.random.default_rng(seed)
+    order_ids, product_ids = [], []
+    for order in range(orders):
+        items = set(rng.choice(products, size=rng.integers(1, 6), replace=False))
+        if rng.random() < 0.3:
+            items |= {0, 1, 2}
+        order_ids.extend([order] * len(items))
+        product_ids.extend(sorted(items))
+    return build_basket(np.array(order_ids), np.array(product_ids) + 100)
+
+
+class ItemsetMiningTests(SimpleTestCase):
+
+    def as_dict(self, itemsets):
+        return {itemset: round(support, 12) for support, itemset in zip(itemsets['support'], itemsets['itemsets'])}
+
+    def test_basket_matches_dense_pivot(self):
+        order_ids = np.array([30, 10, 10, 20, 30, 30])
+        product_ids = np.array([7, 5, 7, 9, 7, 5])  # order 30 lists product 7 twice
+        basket, products = build_basket(order_ids, product_ids)
+        dense = pd.crosstab(order_ids, product_ids) > 0
+        self.assertEqual(list(products), list(dense.columns))
+        self.assertEqual(basket.dtype, bool)
+        np.testing.assert_array_equal(basket.toarray(), dense.to_numpy())
+
+    def test_fpgrowth_matches_apriori(self):
+        basket, products = random_basket()
+        expected = mine_frequent_itemsets(basket, products, min_support=0.03, algorithm='apriori')
+        found = mine_frequent_itemsets(basket, products, min_support=0.03, algorithm='fpgrowth')
+        self.assertEqual(self.as_dict(found), self.as_dict(expected))
+        self.assertEqual(list(found['itemsets']), list(expected['itemsets']))
+
+    def test_fpgrowth_refuses_large_baskets(self):
+        basket, products = random_basket()
+        with mock.patch('store.mining.FPGROWTH_MAX_CELLS', basket.shape[0] * basket.shape[1] - 1), \
+                self.assertRaisesMessage(ValueError, 'use the apriori algorithm'):
+            mine_frequent_itemsets(basket, products, algorithm='fpgrowth')
+
+    def test_sparse_apriori_matches_mlxtend(self):
+        basket, _ = random_basket()
+        dense = pd.DataFrame(basket.toarray())
+        expected = apriori(dense, min_support=0.03)
+        self.assertGreater(expected['itemsets'].map(len).max(), 2)
+        self.assertEqual(self.as_dict(sparse_apriori(basket, min_support=0.03)), self.as_dict(expected))
+
+    def test_output_does_not_depend_on_workers(self):
+        basket, products = random_basket()
+        serial = mine_frequent_itemsets(basket, products, min_support=0.03, workers=1)
+        for workers in (2, 3, 7):
+            parallel = mine_frequent_itemsets(basket, products, min_support=0.03, workers=workers)
+            pd.testing.assert_frame_equal(parallel, serial, check_exact=False, rtol=1e-12)
+
+
+def small_basket():
+    """Five orders over products 100-103: 100 & 101 are bought together three times, 100 & 102 twice."""
+    baskets = ([100, 101], [100, 101, 102], [100, 102], [100, 101], [103])
+    return build_basket([order for order, items in enumerate(baskets) for _ in items],
+                        [product for items in baskets for product in items])
+
+
+class CooccurrenceRecommenderTests(SimpleTestCase):
+
+    def setUp(self):
+        self.recommender = CooccurrenceRecommender.from_basket(*small_basket())
+
+    def test_matrix_counts_orders_bought_together(self):
+        np.testing.assert_array_equal(self.recommender.matrix.toarray(), [[0, 3, 2, 0],
+                                                                          [3, 0, 1, 0],
+                                                                          [2, 1, 0, 0],
+                                                                          [0, 0, 0, 0]])
+
+    def test_recommend(self):
+        recommend = self.recommender.recommend
+        self.assertEqual(recommend([100]), [101, 102])
+        self.assertEqual(recommend([101]), [100, 102])
+        self.assertEqual(recommend([101, 102]), [100])  # scores add up over the cart; the cart is left out
+        self.assertEqual(recommend([100], k=1), [101])
+        self.assertEqual(recommend([100, 999]), [101, 102])  # unknown products are ignored
+        self.assertEqual(recommend([999]), [])
+        self.assertEqual(recommend([103]), [])  # never bought with anything
+        self.assertEqual(recommend([]), [])
+
+
+class ModelArtifactTests(SimpleTestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        overrides = override_settings(RECOMMENDATION_MODEL_DIR=self.root)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.recommender = CooccurrenceRecommender.from_basket(*small_basket())
+
+    def test_nothing_published(self):
+        self.assertIsNone(current_version())
+        self.assertIsNone(load_current_model())
+
+    def test_published_model_is_memory_mapped(self):
+        version = publish_model(self.recommender)
+        self.assertEqual(current_version(), version)
+        self.assertEqual(sorted(os.listdir(self.root)), sorted(['CURRENT', version]))
+
+        model = load_current_model()
+        for array in (model.matrix.data, model.matrix.indices, model.matrix.indptr):
+            self.assertFalse(array.flags.writeable)  # the read-only mapping, not a copy
+        self.assertEqual(model.recommend([100]), [101, 102])
+        self.assertIs(load_current_model(), model)  # mapped once per version
+
+    def test_publish_swaps_current_and_prunes_old_versions(self):
+        versions = [publish_model(self.recommender, keep=2) for _ in range(3)]
+        old = load_current_model()
+        changed = build_basket([0, 0, 1, 1], [100, 102, 100, 102])
+        version = publish_model(CooccurrenceRecommender.from_basket(*changed), keep=2)
+
+        self.assertEqual(current_version(), version)
+        self.assertEqual(sorted(os.listdir(self.root)), sorted(['CURRENT', versions[-1], version]))
+        self.assertEqual(old.recommend([100]), [101, 102])  # readers keep the version they mapped
+        self.assertEqual(load_current_model().recommend([100]), [102])
+
+
+@override_settings(RECOMMENDATION_ENGINE='rules')
+class RecommendationCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.a, cls.b, cls.c = (product.id for product in create_products(3))
+        AssociationRule.objects.create(antecedent_id=cls.a, consequent_id=cls.b, support=0.1, confidence=0.5, lift=2)
+
+    def setUp(self):
+        caches['recommendations'].clear()
+
+    def test_cart_contents_are_the_key(self):
+        self.assertEqual(recommended_ids([self.a]), [self.b])
+        AssociationRule.objects.update(consequent_id=self.c)
+        with self.assertNumQueries(1):  # the model version only
+            self.assertEqual(recommended_ids([self.a, self.a]), [self.b])
+        self.assertEqual(recommended_ids([self.a, self.c]), [])
+
+    def test_new_rules_version_is_not_served_stale_results(self):
+        self.assertEqual(recommended_ids([self.a]), [self.b])
+        AssociationRule.objects.update(consequent_id=self.c)
+        RecommendationStats.load()
+        RecommendationStats.objects.filter(pk=1).update(rules_version=F('rules_version') + 1)
+        self.assertEqual(recommended_ids([self.a]), [self.c])
+
+        rebuild_association_rules()  # no orders: no rules, and a new version
+        self.assertEqual(recommended_ids([self.a]), [])
+
+
+class RecommendationBudgetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.a, cls.b, cls.c, cls.d = (product.id for product in create_products(4))
+        for product_id, count in ((cls.a, 9), (cls.c, 3), (cls.d, 5)):
+            ProductOrderCount.objects.create(product_id=product_id, count=count)
+
+    def ids(self, products):
+        return [product.id for product in products]
+
+    def test_answer_within_budget(self):
+        with mock.patch('store.recommendations.recommended_ids', return_value=[self.b]):
+            self.assertEqual(self.ids(get_recommendations_within_budget([self.a], budget_ms=5000)), [self.b])
+
+    def test_slow_engine_falls_back_to_popular_products(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def slow(cart_product_ids):
+            release.wait(5)
+            return [self.b]
+
+        with mock.patch('store.recommendations.recommended_ids', slow), \
+                self.assertLogs('store.recommendations', 'WARNING'):
+            products = get_recommendations_within_budget([self.a], budget_ms=10)
+        self.assertEqual(self.ids(products), [self.d, self.c])  # the cart is left out
+
+    def test_failing_engine_falls_back_to_popular_products(self):
+        with mock.patch('store.recommendations.recommended_ids', side_effect=RuntimeError), \
+                self.assertLogs('store.recommendations', 'ERROR'):
+            products = get_recommendations_within_budget([self.d], budget_ms=5000)
+        self.assertEqual(self.ids(products), [self.a, self.c])
+
+    def test_empty_cart(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(self.ids(get_recommendations_within_budget([])), [])
+
+
+class FrequentlyBoughtTogetherTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.a, cls.b, cls.c, cls.d, cls.e = (product.id for product in create_products(5))
+        for antecedent, consequent, confidence, lift in ((cls.a, cls.b, 0.5, 2.0), (cls.a, cls.c, 0.8, 1.5),
+                                                         (cls.a, cls.d, 0.8, 3.0), (cls.a, cls.e, 0.1, 9.0),
+                                                         (cls.b, cls.a, 0.4, 2.0)):
+            AssociationRule.objects.create(antecedent_id=antecedent, consequent_id=consequent, support=0.1,
+                                           confidence=confidence, lift=lift)
+
+    def lists(self):
+        lists = {}
+        for row in FrequentlyBoughtTogether.objects.all():
+            lists.setdefault(row.product_id, []).append((row.rank, row.recommended_id))
+        return lists
+
+    def test_top_k_by_confidence_then_lift(self):
+        self.assertEqual(rebuild_frequently_bought_together(top_k=3), 4)
+        self.assertEqual(self.lists(), {self.a: [(0, self.d), (1, self.c), (2, self.b)],
+                                        self.b: [(0, self.a)]})
+
+    def test_rebuild_replaces_the_lists(self):
+        rebuild_frequently_bought_together(top_k=3)
+        AssociationRule.objects.filter(antecedent_id=self.a).delete()
+        self.assertEqual(rebuild_frequently_bought_together(top_k=3), 1)
+        self.assertEqual(self.lists(), {self.b: [(0, self.a)]})
+
+
+class WindowedRecommenderTests(TestCase):
+
+    today = date(2026, 10, 18)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.a, cls.b, cls.c, cls.d = (product.id for product in create_products(4))
+        for age, baskets in ((0, [[cls.a, cls.b]]), (1, [[cls.a, cls.c]] * 2), (2, [[cls.a, cls.d]] * 3)):
+            place_orders(baskets, created_at=cls.at(age))
+
+    @classmethod
+    def at(cls, age):
+        return datetime.combine(cls.today - timedelta(days=age), time(12), tzinfo=dt_timezone.utc)
+
+    def test_only_days_in_the_window_count(self):
+        self.assertEqual(windowed_recommender(2, today=self.today).recommend([self.a]), [self.c, self.b])
+        self.assertEqual(windowed_recommender(3, today=self.today).recommend([self.a]), [self.d, self.c, self.b])
+
+    def test_older_days_weigh_less(self):
+        recommender = windowed_recommender(3, half_life_days=1, today=self.today)
+        row = recommender.products.tolist().index(self.a)
+        weights = dict(zip(recommender.products.tolist(), recommender.matrix[row].toarray().ravel()))
+        self.assertEqual(weights, {self.a: 0, self.b: 1.0, self.c: 1.0, self.d: 0.75})
+        self.assertEqual(windowed_recommender(2, half_life_days=0.5, today=self.today).recommend([self.a]),
+                         [self.b, self.c])
+
+    def test_cached_days_are_reused_until_they_leave_the_window(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        Path(cache_dir, '2000-01-01.npz').touch()
+
+        windowed_recommender(2, cache_dir=cache_dir, today=self.today)
+        yesterday = f'{self.today - timedelta(days=1)}.npz'
+        self.assertEqual(os.listdir(cache_dir), [yesterday])  # today is still filling up
+
+        OrderProduct.objects.filter(created_at=self.at(1)).delete()
+        self.assertEqual(windowed_recommender(2, cache_dir=cache_dir, today=self.today).recommend([self.a]),
+                         [self.c, self.b])
+
+        tomorrow = self.today + timedelta(days=1)
+        self.assertEqual(windowed_recommender(2, cache_dir=cache_dir, today=tomorrow).recommend([self.a]),
+                         [self.b])
+        self.assertEqual(os.listdir(cache_dir), [f'{self.today}.npz'])
+
+
+class SimilarProductTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(category_name='Clothes', slug='clothes')
+        cls.jeans, cls.black_jeans, cls.dress, cls.linen_dress = (
+            Product.objects.create(product_name=name, slug=name.lower().replace(' ', '-'), description=description,
+                                   price=100, images='photoes/products/Blue-Shirt.jpg', stock=5,
+                                   category=category).id
+            for name, description in (('Blue Denim Jeans', 'Slim fit denim jeans, washed blue'),
+                                      ('Black Denim Jeans', 'Straight denim jeans in black'),
+                                      ('Summer Dress', 'Floral cotton summer dress'),
+                                      ('Linen Dress', 'Light linen summer dress'))
+        )
+
+    def test_nearest_neighbours(self):
+        vectors = sparse.csr_matrix([[1, 0, 0], [0.9, 0.1, 0], [0, 0, 1], [0.5, 0, 0.5]])
+        for chunk_size in (1, 3, 1000):
+            neighbours = {row: (list(top), list(scores))
+                          for row, top, scores in nearest_neighbours(vectors, top_k=2, chunk_size=chunk_size)}
+            self.assertEqual(neighbours[0], ([1, 3], [0.9, 0.5]))
+            self.assertEqual(neighbours[2], ([3], [0.5]))  # unrelated rows are left out, never the row itself
+            self.assertEqual(len(neighbours), 4)
+
+    def test_similar_products(self):
+        self.assertEqual(rebuild_similar_products(top_k=2), 8)
+        self.assertEqual(similar_product_ids([self.jeans], k=1), [self.black_jeans])
+        self.assertEqual(similar_product_ids([self.linen_dress], k=1), [self.dress])
+        self.assertEqual(set(similar_product_ids([self.jeans, self.dress], k=2)), {self.black_jeans, self.linen_dress})
+
+    @override_settings(RECOMMENDATION_ENGINE='rules')
+    def test_recommendations_fall_back_to_similar_products(self):
+        caches['recommendations'].clear()
+        rebuild_similar_products(top_k=2)
+        self.assertEqual(recommended_ids([self.dress])[0], self.linen_dress)  # no rules mined yet
+
+
+class AutocompleteTests(TestCase):
+
+    def labels(self, index, prefix, limit=8):
+        return [label for _, label, _, _ in index.suggest(prefix, limit)]
+
+    def test_suggestions_rank_by_popularity(self):
+        index = PrefixIndex([(5, 'Blue Shirt', '/b', 'product'), (9, 'Shirt Dress', '/d', 'product'),
+                             (1, 'Sheer Top', '/t', 'product'), (5, 'Black Shirt', '/k', 'product'),
+                             (7, 'Shirts', '/shirts', 'category')])
+        self.assertEqual(self.labels(index, 'sh'), ['Shirt Dress', 'Shirts', 'Black Shirt', 'Blue Shirt', 'Sheer Top'])
+        self.assertEqual(self.labels(index, 'sh', limit=2), ['Shirt Dress', 'Shirts'])
+        self.assertEqual(self.labels(index, ' SHIRT!'), ['Shirt Dress', 'Shirts', 'Black Shirt', 'Blue Shirt'])
+        self.assertEqual(self.labels(index, 'blue  sh'), ['Blue Shirt'])
+        self.assertEqual(self.labels(index, 'dress'), ['Shirt Dress'])
+        self.assertEqual(self.labels(index, 'hirt'), [])  # words match from their start only
+        self.assertEqual(self.labels(index, '?'), [])
+
+    @override_settings(STORE_AUTOCOMPLETE_CHECK_SECONDS=3600)
+    def test_index_is_rebuilt_when_the_fingerprint_changes(self):
+        first, second = create_products(2, prefix='Shirt')
+        autocomplete.invalidate()
+        index = autocomplete.get_index()
+        self.assertEqual(self.labels(index, 'shirt'), ['Shirt 0', 'Shirt 1', 'Shirt category'])
+        with self.assertNumQueries(0):
+            self.assertIs(autocomplete.get_index(), index)
+
+        autocomplete.invalidate()
+        with self.assertNumQueries(3):  # the fingerprint only
+            self.assertIs(autocomplete.get_index(), index)
+
+        # Order counts change without a signal: picked up at the next check
+        ProductOrderCount.objects.create(product=second, count=4)
+        self.assertIs(autocomplete.get_index(), index)
+        with self.settings(STORE_AUTOCOMPLETE_CHECK_SECONDS=0):
+            self.assertEqual(autocomplete.suggest('shirt')[0]['label'], 'Shirt 1')
+
+        first.product_name = 'Denim Jeans'
+        first.save()
+        self.assertEqual([result['label'] for result in autocomplete.suggest('de')], ['Denim Jeans'])
+
+
+class StaticFilesTests(SimpleTestCase):
+
+    def setUp(self):
+        source, self.root = tempfile.mkdtemp(), tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, source)
+        self.addCleanup(shutil.rmtree, self.root)
+        (Path(source) / 'css').mkdir()
+        (Path(source) / 'css' / 'logo.png').write_bytes(b'\x89PNG logo')
+        rules = ''.join(f'.item-{i} {{ color: #333; margin: {i}px; }}\n' for i in range(200))
+        (Path(source) / 'css' / 'site.css').write_text(
+            'body { background: url("logo.png"); }\n'
+            '.banner { background: url("never-shipped.png"); }\n' + rules)
+        overrides = override_settings(
+            STATICFILES_DIRS=[source], STATIC_ROOT=self.root,
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+            STORAGES={**settings.STORAGES, 'staticfiles': {'BACKEND': 'clothkart.storage.HashedStaticFilesStorage'}},
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_missing_references_are_left_unhashed(self):
+        with self.assertLogs('clothkart.storage', 'WARNING') as logs:
+            call_command('collectstatic', interactive=False, verbosity=0)
+        self.assertIn('never-shipped.png', logs.output[0])
+
+        with open(Path(self.root) / 'staticfiles.json') as f:
+            paths = json.load(f)['paths']
+        self.assertTrue(is_hashed(paths['css/site.css']))
+        css = (Path(self.root) / paths['css/site.css']).read_text()
+        self.assertIn(f'url("{Path(paths["css/logo.png"]).name}")', css)
+        self.assertIn('url("never-shipped.png")', css)
+        self.assertTrue((Path(self.root) / (paths['css/site.css'] + '.gz')).exists())
+
+    def test_report(self):
+        with self.assertRaisesMessage(CommandError, 'run collectstatic'):
+            call_command('static_report')
+
+        with self.assertLogs('clothkart.storage', 'WARNING'):
+            call_command('collectstatic', interactive=False, verbosity=0)
+        out = StringIO()
+        call_command('static_report', stdout=out)
+        report = out.getvalue()
+        self.assertRegex(report, r'gzip: [1-9]\d* files, [1-9]\d* bytes saved')
+        self.assertIn('2 hashed files', report)
 
-# Create your tests here.
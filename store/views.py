@@ -1,18 +1,25 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from .models import Product, ReviewRating, ProductGallery, Category
+from .models import Product, ReviewRating, FrequentlyBoughtTogether, SimilarProduct, ProductFacet, Variation
 from category.models import Category
+from category.menu import menu_categories
 from carts.models import CartItem
-from django.db.models import Q
+from django.db.models import Exists, OuterRef, Prefetch, Q, Value
 
 from carts.views import _cart_id
-from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
-from django.http import HttpResponse
+from django.conf import settings
+from .pagination import KeysetPage, NumberedPage
+from .search import SearchResults
+from .autocomplete import suggest
+from .caching import cache_anonymous_page
+from .facets import PRICE_BUCKETS, facet_counts, size_sort_key
+from django.http import JsonResponse
 from .forms import ReviewForm
 from django.contrib import messages
 from orders.models import OrderProduct
 
 # Create your views here.
 
+@cache_anonymous_page
 def store(request, category_slug=None):
     products = Product.objects.filter(is_available=True)
     categories = None
@@ -32,95 +39,152 @@ def store(request, category_slug=None):
     min_price = request.GET.get('min_price')
     max_price = request.GET.get('max_price')
 
+    # Active filters, one per facet, kept apart so each facet's counts
+    # can leave its own filter out
+    filters = {}
+
     # Filter by category (checkbox/filter UI)
     if category_ids:
-        products = products.filter(category_id__in=category_ids)
+        filters['category'] = Q(category_id__in=category_ids)
 
-    # Filter by size through Variation
+    # Filter by size through the precomputed facets
     if sizes:
-        products = products.filter(
-            variation__variation_category='size',
-            variation__variation_value__in=sizes
-        ).distinct()
+        filters['size'] = Q(id__in=ProductFacet.objects
+                            .filter(facet='size', value__in=sizes)
+                            .values('product_id'))
 
     # Filter by price
+    price_filter = Q()
     if min_price:
-        products = products.filter(price__gte=min_price)
-
+        price_filter &= Q(price__gte=min_price)
     if max_price:
-        products = products.filter(price__lte=max_price)
+        price_filter &= Q(price__lte=max_price)
+    if price_filter:
+        filters['price'] = price_filter
+
+    base_products = products
+    products = base_products.filter(*filters.values())
+
+    # -----------------------------
+    # Facet counts
+    # -----------------------------
+    counts = facet_counts({
+        facet: base_products.filter(*[q for name, q in filters.items() if name != facet])
+        for facet in ('category', 'size', 'price')
+    })
+    links = menu_categories()
+    category_facets = [(category, counts['category'].get(str(category.id), 0)) for category in links]
+    size_facets = [(size, counts['size'][size]) for size in sorted(counts['size'], key=size_sort_key)]
+    price_facets = []
+    for label, low, high in PRICE_BUCKETS:
+        query = request.GET.copy()
+        for name in ('page', 'cursor', 'min_price', 'max_price'):
+            query.pop(name, None)
+        query['min_price'] = low
+        if high is not None:
+            query['max_price'] = high
+        price_facets.append((label, query.urlencode(), counts['price'].get(label, 0)))
 
     # -----------------------------
     # Pagination
     # -----------------------------
-    paginator = Paginator(products, 6)
-    page = request.GET.get('page')
-    paged_products = paginator.get_page(page)
+    # Page numbers for the first pages, then keyset cursors
+    sort = request.GET.get('sort', 'default')
+    paged_products = KeysetPage(request, products, 6, sort=sort,
+                                number_limit=settings.STORE_PAGE_NUMBER_LIMIT)
 
     # -----------------------------
     # Context
     # -----------------------------
     context = {
         'products': paged_products,
-        'product_count': products.count(),
-        'links': Category.objects.all(),
+        'product_count': paged_products.count,
+        'links': links,
         'selected_category': categories,
+        'sort': paged_products.sort,
+        'category_facets': category_facets,
+        'size_facets': size_facets,
+        'price_facets': price_facets,
+        'selected_category_ids': category_ids,
+        'selected_sizes': sizes,
     }
 
     return render(request, 'store/store.html', context)
 
 
 
-def product_detail(request, category_slug, product_slug):
-    try:
-        single_product = Product.objects.get(category__slug=category_slug, slug=product_slug)
-        in_cart = CartItem.objects.filter(cart__cart_id=_cart_id(request), product=single_product).exists()
-    except Exception as e:
-        raise e
-
+def load_product_detail(request, category_slug, product_slug):
+    """
+    The product with everything its page shows, in a fixed number of
+    queries however many reviews, images or variations it has: one for
+    the product (with its cart and purchase flags) and one per prefetch.
+    """
+    in_cart = CartItem.objects.filter(cart__cart_id=_cart_id(request), product=OuterRef('pk'))
     if request.user.is_authenticated:
-        try:
-            orderproduct = OrderProduct.objects.filter(user=request.user, product_id=single_product.id).exists()
-        except OrderProduct.DoesNotExist:
-            orderproduct = None
+        purchased = Exists(OrderProduct.objects.filter(user=request.user, product=OuterRef('pk')))
     else:
-        orderproduct = None
-
-    # Get the reviews
-    reviews = ReviewRating.objects.filter(product_id=single_product.id, status=True)
-
-    # Get the product gallery
-    product_gallery = ProductGallery.objects.filter(product_id=single_product.id)
+        purchased = Value(False)
+
+    products = (Product.objects
+                .select_related('category')
+                .annotate(in_cart=Exists(in_cart), purchased=purchased)
+                .prefetch_related(
+                    Prefetch('variation_set', to_attr='active_colors',
+                             queryset=Variation.objects.filter(variation_category='color', is_active=True)),
+                    Prefetch('variation_set', to_attr='active_sizes',
+                             queryset=Variation.objects.filter(variation_category='size', is_active=True)),
+                    Prefetch('productgallery_set', to_attr='gallery'),
+                    Prefetch('reviewrating_set', to_attr='active_reviews',
+                             queryset=ReviewRating.objects.filter(status=True).select_related('user')),
+                    # Precomputed cross-sell list and content neighbours, best first
+                    Prefetch('bought_together',
+                             queryset=FrequentlyBoughtTogether.objects.select_related('recommended__category')),
+                    Prefetch('similar_products',
+                             queryset=SimilarProduct.objects.select_related('similar__category')),
+                ))
+    return get_object_or_404(products, category__slug=category_slug, slug=product_slug)
+
+
+@cache_anonymous_page
+def product_detail(request, category_slug, product_slug):
+    single_product = load_product_detail(request, category_slug, product_slug)
 
     context = {
         'single_product': single_product,
-        'in_cart'       : in_cart,
-        'orderproduct': orderproduct,
-        'reviews': reviews,
-        'product_gallery': product_gallery,
+        'in_cart'       : single_product.in_cart,
+        'orderproduct': single_product.purchased,
+        'reviews': single_product.active_reviews,
+        'product_gallery': single_product.gallery,
+        'bought_together': single_product.bought_together.all(),
+        'similar_products': single_product.similar_products.all(),
     }
     return render(request, 'store/product_detail.html', context)
 
 
 def search(request):
-    products = Product.objects.none()  # initialize to empty queryset
-    product_count = 0                   # initialize count
     keyword = request.GET.get('keyword', '').strip()  # get keyword safely
 
-    if keyword:
-        products = Product.objects.filter(
-            Q(description__icontains=keyword) | Q(product_name__icontains=keyword)
-        ).order_by('-created_date')
-        product_count = products.count()
+    # Best matches first, one page fetched from the search index
+    paged_products = NumberedPage(request, SearchResults(keyword), 6)
 
     context = {
-        'products': products,
-        'product_count': product_count,
+        'products': paged_products,
+        'product_count': paged_products.count,
         'keyword': keyword,
     }
     return render(request, 'store/store.html', context)
 
 
+def autocomplete(request):
+    """Type-ahead suggestions for the navbar search box, from the in-process prefix index."""
+    try:
+        limit = min(max(int(request.GET.get('limit', 8)), 1), 20)
+    except ValueError:
+        limit = 8
+    results = suggest(request.GET.get('q', '')[:100], limit)
+    return JsonResponse({'results': results})
+
+
 def submit_review(request, product_id):
     url = request.META.get('HTTP_REFERER')
     if request.method == 'POST':